@@ -0,0 +1,12 @@
+'''Бэкенды БД с проверкой постоянных соединений, пулом и метриками.
+
+ENGINE 'core.backends.sqlite3' или 'core.backends.postgresql'
+ведет себя как стандартный бэкенд Django с такими дополнениями:
+
+* постоянное соединение (CONN_MAX_AGE > 0) проверяется перед первым
+  запросом каждого HTTP-запроса и переоткрывается, если оборвалось;
+* при POOL_SIZE > 0 закрытые соединения не закрываются, а
+  возвращаются в пул процесса и переиспользуются другими потоками;
+* время получения соединения копится в core.backends.metrics и
+  попадает в заголовок Server-Timing.
+'''
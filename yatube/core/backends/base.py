@@ -0,0 +1,126 @@
+import queue
+import threading
+import time
+
+from django.db import connections
+
+_metrics = threading.local()
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def reset_metrics():
+    _metrics.count = 0
+    _metrics.duration = 0.0
+
+
+def metrics():
+    '''Сколько раз и сколько секунд поток получал соединение.'''
+    return getattr(_metrics, 'count', 0), getattr(_metrics, 'duration', 0.0)
+
+
+def request_started(**kwargs):
+    '''Постоянные соединения проверяются в начале каждого запроса.'''
+    for connection in connections.all():
+        if isinstance(connection, PooledWrapperMixin):
+            connection.health_check_needed = True
+
+
+class ConnectionPool:
+    '''Простаивающие соединения одной базы, общие для потоков.'''
+
+    def __init__(self, size, check_after):
+        self.size = size
+        self.check_after = check_after
+        self.idle = queue.LifoQueue()
+
+    def acquire(self, connect):
+        while True:
+            try:
+                conn, released = self.idle.get_nowait()
+            except queue.Empty:
+                return connect()
+            if time.monotonic() - released < self.check_after:
+                return conn
+            if self.usable(conn):
+                return conn
+            self.discard(conn)
+
+    def release(self, conn):
+        try:
+            conn.rollback()
+        except Exception:
+            self.discard(conn)
+            return
+        if self.idle.qsize() < self.size:
+            self.idle.put((conn, time.monotonic()))
+        else:
+            self.discard(conn)
+
+    @staticmethod
+    def usable(conn):
+        try:
+            conn.cursor().execute('SELECT 1')
+        except Exception:
+            return False
+        return True
+
+    @staticmethod
+    def discard(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def get_pool(alias, size, check_after):
+    with _pools_lock:
+        if alias not in _pools:
+            _pools[alias] = ConnectionPool(size, check_after)
+        return _pools[alias]
+
+
+class PooledWrapperMixin:
+    '''Добавляется перед DatabaseWrapper стандартного бэкенда.'''
+
+    health_check_needed = False
+
+    @property
+    def pool(self):
+        size = self.settings_dict.get('POOL_SIZE', 0)
+        if not size:
+            return None
+        return get_pool(self.alias, size,
+                        self.settings_dict.get('POOL_CHECK_AFTER', 30))
+
+    def ensure_connection(self):
+        if self.connection is not None and not self.health_check_needed:
+            return
+        start = time.perf_counter()
+        if self.health_check_needed:
+            self.health_check_needed = False
+            if (self.connection is not None and not self.in_atomic_block
+                    and not self.is_usable()):
+                # Оборванное соединение не должно вернуться в пул.
+                ConnectionPool.discard(self.connection)
+                self.connection = None
+        created = self.connection is None
+        super().ensure_connection()
+        if created:
+            _metrics.count = metrics()[0] + 1
+        _metrics.duration = metrics()[1] + time.perf_counter() - start
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        return pool.acquire(
+            lambda: super(PooledWrapperMixin, self).get_new_connection(
+                conn_params))
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            pool.release(self.connection)
@@ -0,0 +1,7 @@
+from django.db.backends.postgresql import base
+
+from ..base import PooledWrapperMixin
+
+
+class DatabaseWrapper(PooledWrapperMixin, base.DatabaseWrapper):
+    pass
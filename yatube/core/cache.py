@@ -0,0 +1,205 @@
+import math
+import random
+import time
+
+from django.core.cache import cache as default_cache
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.functional import cached_property
+
+LOCK_SUFFIX = ':lock'
+LOCK_TIMEOUT = 30
+LOCK_WAIT = 2.0
+LOCK_POLL = 0.05
+
+
+class TwoTierCache(BaseCache):
+    '''Двухуровневый кэш: маленький L1 в памяти процесса перед общим L2.
+
+    L2 — любой кэш из settings.CACHES (Redis, memcached или LocMemCache
+    как локальная замена сервера), его алиас задается в OPTIONS['SHARED'].
+    Записи идут в оба уровня, L1 живет не дольше LOCAL_TIMEOUT секунд,
+    поэтому изменения из других процессов видны с этой задержкой.
+    Счетчики (incr/decr) и add выполняются только в L2.
+    '''
+
+    def __init__(self, location, params):
+        params = dict(params)
+        options = dict(params.pop('OPTIONS', {}))
+        self.shared_alias = options.pop('SHARED', 'shared')
+        self.local_timeout = options.pop('LOCAL_TIMEOUT', 5)
+        local_entries = options.pop('LOCAL_MAX_ENTRIES', 1000)
+        super().__init__(params)
+        self.local = LocMemCache(f'two-tier:{location}', {
+            'TIMEOUT': self.local_timeout,
+            'OPTIONS': {'MAX_ENTRIES': local_entries},
+        })
+
+    @cached_property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _local_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT or timeout is None:
+            return self.local_timeout
+        return min(timeout, self.local_timeout)
+
+    def get(self, key, default=None, version=None):
+        value = self.local.get(key, version=version)
+        if value is not None:
+            return value
+        value = self.shared.get(key, version=version)
+        if value is None:
+            return default
+        self.local.set(key, value, version=version)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = self.local.get_many(keys, version=version)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            shared = self.shared.get_many(missing, version=version)
+            if shared:
+                self.local.set_many(shared, version=version)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self.local.set(
+            key, value, self._local_timeout(timeout), version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        self.local.set_many(
+            data, self._local_timeout(timeout), version=version)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self.local.set(
+                key, value, self._local_timeout(timeout), version=version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self.local.delete(key, version=version)
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.local.delete(key, version=version)
+        return self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        self.local.delete_many(keys, version=version)
+        self.shared.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        return (self.local.has_key(key, version=version)
+                or self.shared.has_key(key, version=version))
+
+    def incr(self, key, delta=1, version=None):
+        self.local.delete(key, version=version)
+        return self.shared.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        self.local.delete(key, version=version)
+        return self.shared.decr(key, delta, version=version)
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        '''get_or_set, при промахе значение считает только один процесс.'''
+        value = self.get(key, version=version)
+        if value is not None:
+            return value
+
+        def compute():
+            value = default() if callable(default) else default
+            self.set(key, value, timeout, version=version)
+            return value
+
+        return _locked(self, key, compute,
+                       lambda: self.get(key, version=version))
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+
+def _locked(cache, key, compute, lookup):
+    '''Вычисляет значение под блокировкой в кэше.
+
+    Пока блокировку держит другой процесс, ждем его результат не дольше
+    LOCK_WAIT секунд, потом считаем сами.
+    '''
+    lock = key + LOCK_SUFFIX
+    if not cache.add(lock, True, LOCK_TIMEOUT):
+        deadline = time.monotonic() + LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL)
+            value = lookup()
+            if value is not None:
+                return value
+        return compute()
+    try:
+        return compute()
+    finally:
+        cache.delete(lock)
+
+
+def store(key, value, timeout, delta=0.0, cache=None):
+    '''Кладет value в кэш в формате remember; delta — сколько секунд
+    оно вычислялось.
+    '''
+    (cache or default_cache).set(
+        key, (value, delta, time.time() + timeout), timeout)
+
+
+def _fresh(entry, beta):
+    '''Можно ли отдать запись remember без раннего пересчета.'''
+    value, delta, expires = entry
+    early = delta * beta * math.log(1 - random.random())
+    return time.time() - early < expires
+
+
+def _remember(cache, key, entry, compute, timeout, beta):
+    def recompute():
+        start = time.time()
+        value = compute()
+        store(key, value, timeout, time.time() - start, cache)
+        return value
+
+    def lookup():
+        fresh = cache.get(key)
+        return None if fresh is None else fresh[0]
+
+    if entry is not None:
+        if _fresh(entry, beta) or cache.has_key(key + LOCK_SUFFIX):
+            return entry[0]
+    return _locked(cache, key, recompute, lookup)
+
+
+def remember(key, compute, timeout, beta=1.0, cache=None):
+    '''Значение из кэша с защитой от одновременного пересчета.
+
+    Помимо блокировки используется вероятностный ранний пересчет
+    (XFetch): чем ближе истечение и чем дольше считается значение,
+    тем вероятнее, что один из запросов пересчитает его заранее,
+    а остальные продолжат получать старое значение.
+    '''
+    cache = cache or default_cache
+    return _remember(cache, key, cache.get(key), compute, timeout, beta)
+
+
+def remember_many(computes, timeout, beta=1.0, cache=None):
+    '''remember для словаря {ключ: compute}: записи читаются одним
+    get_many, пересчитываются только промахи и устаревшие.
+    '''
+    cache = cache or default_cache
+    entries = cache.get_many(list(computes))
+    return {key: _remember(cache, key, entries.get(key), compute, timeout,
+                           beta)
+            for key, compute in computes.items()}
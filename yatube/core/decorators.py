@@ -0,0 +1,62 @@
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import quote_etag
+
+
+def query_budget(queries, duplicates=None):
+    '''Объявляет для view бюджет запросов к БД.
+
+    queries — сколько запросов разрешено за весь запрос, включая
+    сессию и пользователя; duplicates — сколько раз допускается один
+    и тот же SQL (по умолчанию settings.QUERY_BUDGET_DUPLICATES).
+    '''
+    def decorator(view):
+        view.query_budget = (queries, duplicates)
+        return view
+    return decorator
+
+
+def use_replica(view):
+    '''Разрешает view читать из реплик базы (см. ReplicaMiddleware).'''
+    view.use_replica = True
+    return view
+
+
+def conditional_page(etag_func, max_age=None):
+    '''Условные GET-запросы и Cache-Control для страницы.
+
+    etag_func(request, *args, **kwargs) возвращает дешевый валидатор
+    содержимого страницы или None, если его нельзя вычислить. К нему
+    добавляется пользователь, поэтому у каждого вошедшего свой ETag.
+    Анонимным страница разрешена к кэшированию на max_age секунд
+    (по умолчанию settings.PUBLIC_CACHE_MAX_AGE), вошедшим — только
+    с перепроверкой.
+    '''
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            etag = None
+            if request.method in ('GET', 'HEAD'):
+                validator = etag_func(request, *args, **kwargs)
+                if validator is not None:
+                    etag = quote_etag(f'{validator}-{request.user.pk or 0}')
+            response = None
+            if etag:
+                response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if etag and response.status_code in (200, 304):
+                response['ETag'] = etag
+                if request.user.is_authenticated:
+                    patch_cache_control(response, private=True, no_cache=True)
+                else:
+                    patch_cache_control(response, public=True, max_age=(
+                        settings.PUBLIC_CACHE_MAX_AGE if max_age is None
+                        else max_age))
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
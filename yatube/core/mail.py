@@ -0,0 +1,39 @@
+'''Отправка писем через очередь задач.
+
+QueuedEmailBackend только ставит письма в очередь, отправляет их
+воркер через TASKS_EMAIL_BACKEND.
+'''
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .tasks import task
+
+
+def serialize(message):
+    return {
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': getattr(message, 'alternatives', []),
+    }
+
+
+@task(max_attempts=5, retry_delay=60)
+def send_email(data):
+    '''Отправляет письмо, сохраненное serialize.'''
+    message = EmailMultiAlternatives(**data)
+    connection = get_connection(settings.TASKS_EMAIL_BACKEND)
+    connection.send_messages([message])
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            send_email.delay(serialize(message))
+        return len(email_messages)
@@ -0,0 +1,53 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core import tasks
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+
+def run(job):
+    try:
+        return tasks.execute(job)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = ('Выполняет фоновые задачи из очереди пулом потоков. '
+            'С --once выходит, когда очередь опустеет.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.TASKS_WORKERS,
+            help='Число потоков; при 1 задачи выполняются в текущем.')
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Пауза в секундах, если очередь пуста.')
+        parser.add_argument('--once', action='store_true')
+
+    def handle(self, *args, **options):
+        pool = None
+        if options['workers'] > 1:
+            pool = ThreadPoolExecutor(
+                max_workers=options['workers'], thread_name_prefix='tasks')
+        done = failed = 0
+        try:
+            while True:
+                jobs = tasks.claim(options['batch_size'])
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+                results = (pool.map(run, jobs) if pool
+                           else map(tasks.execute, jobs))
+                for ok in results:
+                    done += ok
+                    failed += not ok
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        self.stdout.write(self.style.SUCCESS(
+            f'Выполнено задач: {done}, с ошибкой: {failed}.'))
@@ -0,0 +1,145 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import cc_delim_re
+
+from . import routers
+from .backends.base import metrics, reset_metrics
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = 'primary_pin'
+IN_LIST = re.compile(r'IN \((%s(, )?)+\)')
+
+
+class QueryBudgetExceeded(Exception):
+    '''View выполнила больше запросов, чем ей разрешено.'''
+
+
+def fingerprint(sql):
+    '''SQL без параметров: списки IN (%s, %s, ...) схлопываются.'''
+    return IN_LIST.sub('IN (...)', sql)
+
+
+def is_public(response):
+    '''Разрешено ли хранить ответ в общих кэшах.'''
+    directives = cc_delim_re.split(response.get('Cache-Control', ''))
+    return 'public' in (directive.strip().lower() for directive in directives)
+
+
+class QueryRecorder:
+    '''Обертка execute_wrapper, считающая запросы и время в БД.'''
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self, limit):
+        return {sql: times for sql, times in self.fingerprints.items()
+                if times > limit}
+
+
+class QueryBudgetMiddleware:
+    '''Считает запросы к БД и проверяет бюджет view.
+
+    Бюджет объявляется декоратором core.decorators.query_budget.
+    Нарушения пишутся в лог, а при QUERY_BUDGET_STRICT = True
+    поднимают QueryBudgetExceeded. Число запросов и время в БД,
+    число новых соединений и время их получения отдаются в заголовке
+    Server-Timing.
+    '''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        reset_metrics()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(recorder))
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+        connects, connect_time = metrics()
+        response['Server-Timing'] = (
+            f'db;dur={recorder.duration * 1000:.2f};'
+            f'desc="{recorder.count} queries", '
+            f'conn;dur={connect_time * 1000:.2f};'
+            f'desc="{connects} connects", '
+            f'app;dur={total * 1000:.2f}')
+        budget = getattr(request, 'query_budget', None)
+        if budget is not None:
+            self.check(request, recorder, *budget)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        budget = getattr(view_func, 'query_budget', None)
+        if budget is not None:
+            request.query_budget = budget
+
+    def check(self, request, recorder, queries, duplicates):
+        if duplicates is None:
+            duplicates = settings.QUERY_BUDGET_DUPLICATES
+        problems = []
+        if recorder.count > queries:
+            problems.append(
+                f'{recorder.count} запросов при бюджете {queries}')
+        for sql, times in recorder.duplicates(duplicates).items():
+            problems.append(f'{times} одинаковых запросов: {sql}')
+        if not problems:
+            return
+        message = f'{request.path}: ' + '; '.join(problems)
+        if settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class ReplicaMiddleware:
+    '''Разрешает view, помеченным core.decorators.use_replica,
+    читать из реплик.
+
+    После запроса с записью пользователь на REPLICA_PIN_SECONDS
+    закрепляется за основной базой через cookie, чтобы не увидеть
+    отстающую реплику без своих изменений. Публичные ответы, которые
+    может сохранить общий кэш, cookie не получают.
+    '''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.begin()
+        try:
+            response = self.get_response(request)
+            if routers.wrote() and not is_public(response):
+                response.set_cookie(
+                    PIN_COOKIE,
+                    str(int(time.time()) + settings.REPLICA_PIN_SECONDS),
+                    max_age=settings.REPLICA_PIN_SECONDS)
+        finally:
+            routers.end()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        try:
+            pinned = int(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            pinned = False
+        routers.begin(getattr(view_func, 'use_replica', False) and not pinned)
@@ -18,3 +18,35 @@ class BaseModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class Task(models.Model):
+    '''Отложенный вызов функции с декоратором core.tasks.task.'''
+    QUEUED = 'queued'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (FAILED, 'Ошибка'),
+    )
+    name = models.CharField(verbose_name='Задача', max_length=200)
+    payload = models.TextField(verbose_name='Аргументы')
+    status = models.CharField(
+        verbose_name='Статус', max_length=10, choices=STATUSES,
+        default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток', default=0)
+    run_at = models.DateTimeField(verbose_name='Запустить после')
+    locked_until = models.DateTimeField(
+        verbose_name='Занята до', null=True, blank=True)
+    last_error = models.TextField(verbose_name='Последняя ошибка', blank=True)
+    created = models.DateTimeField(
+        verbose_name='Поставлена', auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = 'Задачи'
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='task_due_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
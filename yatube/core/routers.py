@@ -0,0 +1,103 @@
+import itertools
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections, router
+
+_state = threading.local()
+
+
+def replica_router():
+    '''ReplicaRouter из settings.DATABASE_ROUTERS или None.'''
+    for candidate in router.routers:
+        if isinstance(candidate, ReplicaRouter):
+            return candidate
+    return None
+
+
+def begin(use_replicas=False):
+    '''Начало запроса: можно ли читать из реплик.
+
+    Реплика выбирается один раз на весь запрос, чтобы все его чтения
+    видели одно и то же состояние данных.
+    '''
+    replicas = replica_router() if use_replicas else None
+    _state.use_replicas = use_replicas
+    _state.replica = replicas.choose() if replicas else None
+    _state.wrote = False
+
+
+def wrote():
+    '''Была ли в текущем запросе запись в основную базу.'''
+    return getattr(_state, 'wrote', False)
+
+
+def end():
+    _state.__dict__.clear()
+
+
+def mirrors_primary(alias):
+    '''Реплика, указывающая на саму основную базу (зеркало в тестах),
+    читается через основное соединение: отдельное соединение не видит
+    данные незакрытой транзакции.
+    '''
+    return (alias in connections.databases
+            and connections[alias].settings_dict['NAME']
+            == connections['default'].settings_dict['NAME'])
+
+
+class ReplicaRouter:
+    '''Отправляет чтение в реплики из settings.DATABASE_REPLICAS.
+
+    Реплики используются только внутри запросов, для которых
+    ReplicaMiddleware вызвал begin(True), и только до первой записи:
+    после нее запрос читает из основной базы, чтобы видеть свои
+    изменения. Записи моделей из REPLICA_PIN_IGNORE (очередь задач,
+    хранилище миниатюр) записью пользователя не считаются. Запросы
+    получают реплики по кругу, недоступная реплика пропускается
+    REPLICA_RETRY секунд.
+    '''
+
+    def __init__(self):
+        self.counter = itertools.count()
+        self.down = {}
+        self.checked = {}
+
+    def healthy(self, alias):
+        now = time.monotonic()
+        if self.down.get(alias, 0) > now:
+            return False
+        if self.checked.get(alias, 0) + settings.REPLICA_CHECK_INTERVAL > now:
+            return True
+        self.checked[alias] = now
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            self.mark_down(alias)
+            return False
+        return True
+
+    def mark_down(self, alias):
+        self.down[alias] = time.monotonic() + settings.REPLICA_RETRY
+
+    def choose(self):
+        '''Следующая по кругу доступная реплика или None.'''
+        replicas = [alias for alias in settings.DATABASE_REPLICAS
+                    if not mirrors_primary(alias) and self.healthy(alias)]
+        if not replicas:
+            return None
+        return replicas[next(self.counter) % len(replicas)]
+
+    def db_for_read(self, model, **hints):
+        if not getattr(_state, 'use_replicas', False) or wrote():
+            return None
+        return getattr(_state, 'replica', None)
+
+    def db_for_write(self, model, **hints):
+        if model._meta.label not in settings.REPLICA_PIN_IGNORE:
+            _state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
@@ -0,0 +1,108 @@
+'''Очередь фоновых задач в таблице core_task.
+
+Функция с декоратором @task получает метод delay: вызов сохраняется
+строкой в той же транзакции, что и данные запроса, и выполняется
+командой run_tasks. Упавшая задача повторяется с растущей паузой,
+после max_attempts попыток остается со статусом failed. При
+TASKS_EAGER задачи выполняются сразу при вызове delay.
+'''
+import json
+import logging
+import traceback
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+class TaskFunction:
+    def __init__(self, func, name, max_attempts, retry_delay):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        '''Ставит вызов в очередь; аргументы должны сериализоваться
+        в JSON.
+        '''
+        payload = json.dumps([args, kwargs])
+        if settings.TASKS_EAGER:
+            args, kwargs = json.loads(payload)
+            return self.func(*args, **kwargs)
+        return Task.objects.create(
+            name=self.name, payload=payload, run_at=timezone.now())
+
+    def retry_at(self, attempts):
+        return timezone.now() + timedelta(
+            seconds=self.retry_delay * 2 ** (attempts - 1))
+
+
+def task(func=None, *, max_attempts=3, retry_delay=10):
+    '''Регистрирует функцию как задачу под именем module.function.'''
+    def register(func):
+        name = f'{func.__module__}.{func.__name__}'
+        registry[name] = TaskFunction(func, name, max_attempts, retry_delay)
+        return registry[name]
+    return register(func) if func else register
+
+
+def lookup(name):
+    '''Задача по имени; модуль импортируется, если еще не загружен.'''
+    if name not in registry:
+        import_module(name.rsplit('.', 1)[0])
+    return registry[name]
+
+
+def claim(limit):
+    '''Забирает до limit готовых задач на TASKS_LEASE секунд.
+
+    Задача достается тому, чей UPDATE изменил строку, поэтому
+    несколько воркеров не выполнят ее дважды; задача упавшего
+    воркера снова станет доступна после истечения аренды.
+    '''
+    now = timezone.now()
+    free = Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+    due = Task.objects.filter(free, status=Task.QUEUED, run_at__lte=now)
+    claimed = []
+    for pk in due.order_by('run_at', 'id').values_list('pk', flat=True)[
+            :limit]:
+        if Task.objects.filter(free, pk=pk).update(
+                locked_until=now + timedelta(seconds=settings.TASKS_LEASE),
+                attempts=F('attempts') + 1):
+            claimed.append(pk)
+    return list(Task.objects.filter(pk__in=claimed).order_by('run_at', 'id'))
+
+
+def execute(job):
+    '''Выполняет задачу: удаляет при успехе, иначе откладывает
+    повтор или помечает failed.
+    '''
+    try:
+        func = lookup(job.name)
+        args, kwargs = json.loads(job.payload)
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Задача %s упала', job)
+        func = registry.get(job.name)
+        updates = {'locked_until': None, 'last_error': traceback.format_exc()}
+        if func is not None and job.attempts < func.max_attempts:
+            updates['run_at'] = func.retry_at(job.attempts)
+        else:
+            updates['status'] = Task.FAILED
+        Task.objects.filter(pk=job.pk).update(**updates)
+        return False
+    Task.objects.filter(pk=job.pk).delete()
+    return True
@@ -0,0 +1,69 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest import mock
+
+from core.backends.base import ConnectionPool, metrics, reset_metrics
+from core.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase
+
+
+def make_wrapper(path, pool_size):
+    return DatabaseWrapper({
+        'ENGINE': 'core.backends.sqlite3', 'NAME': path,
+        'USER': '', 'PASSWORD': '', 'HOST': '', 'PORT': '',
+        'OPTIONS': {}, 'TIME_ZONE': None, 'TEST': {},
+        'AUTOCOMMIT': True, 'ATOMIC_REQUESTS': False, 'CONN_MAX_AGE': 60,
+        'POOL_SIZE': pool_size,
+    }, alias=f'pool-test-{pool_size}')
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'db.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def connect(self):
+        return sqlite3.connect(self.path, check_same_thread=False)
+
+    def test_pool_reuses_connection(self):
+        '''Пул отдает возвращенное соединение повторно'''
+        pool = ConnectionPool(size=1, check_after=30)
+        conn = pool.acquire(self.connect)
+        pool.release(conn)
+        self.assertIs(pool.acquire(self.connect), conn)
+
+    def test_pool_drops_broken_connection(self):
+        '''Оборванное соединение из пула заменяется новым'''
+        pool = ConnectionPool(size=1, check_after=0)
+        conn = pool.acquire(self.connect)
+        pool.release(conn)
+        conn.close()
+        self.assertIsNot(pool.acquire(self.connect), conn)
+
+    def test_wrapper_uses_pool(self):
+        '''Закрытое соединение бэкенда возвращается в пул'''
+        wrapper = make_wrapper(self.path, pool_size=2)
+        reset_metrics()
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+        wrapper.ensure_connection()
+        self.assertIs(wrapper.connection, raw)
+        self.assertEqual(metrics()[0], 2)
+        wrapper.close()
+
+    def test_health_check(self):
+        '''Постоянное соединение проверяется в начале запроса'''
+        wrapper = make_wrapper(self.path, pool_size=0)
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.health_check_needed = True
+        with mock.patch.object(wrapper, 'is_usable', return_value=False):
+            wrapper.ensure_connection()
+        self.assertIsNot(wrapper.connection, raw)
+        wrapper.close()
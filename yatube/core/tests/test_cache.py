@@ -0,0 +1,84 @@
+import threading
+import time
+
+from core.cache import remember, remember_many
+from django.core.cache import cache, caches
+from django.test import SimpleTestCase
+
+
+class TwoTierCacheTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_write_through(self):
+        '''Запись попадает в оба уровня'''
+        cache.set('key', 'value')
+        self.assertEqual(cache.local.get('key'), 'value')
+        self.assertEqual(caches['shared'].get('key'), 'value')
+        cache.delete('key')
+        self.assertIsNone(cache.get('key'))
+
+    def test_local_tier_filled_from_shared(self):
+        '''Промах L1 заполняется из общего кэша'''
+        caches['shared'].set('key', 'value')
+        self.assertEqual(cache.get_many(['key', 'other']), {'key': 'value'})
+        self.assertEqual(cache.local.get('key'), 'value')
+
+    def test_incr_goes_to_shared(self):
+        '''Счетчик хранится только в общем кэше'''
+        cache.set('counter', 1)
+        self.assertEqual(cache.incr('counter'), 2)
+        self.assertEqual(cache.get('counter'), 2)
+
+    def test_get_or_set_computes_once(self):
+        '''При одновременном промахе значение считается один раз'''
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        threads = [threading.Thread(
+            target=cache.get_or_set, args=('slow', compute))
+            for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.get('slow'), 'value')
+
+
+class RememberTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_until_expiry(self):
+        '''remember отдает сохраненное значение'''
+        self.assertEqual(remember('key', lambda: 1, 60), 1)
+        self.assertEqual(remember('key', lambda: 2, 60), 1)
+
+    def test_stale_value_while_locked(self):
+        '''Пока другой процесс пересчитывает, отдается старое значение'''
+        cache.set('key', ('old', 1.0, time.time() - 1), 60)
+        cache.add('key:lock', True)
+        self.assertEqual(remember('key', lambda: 'new', 60), 'old')
+        cache.delete('key:lock')
+        self.assertEqual(remember('key', lambda: 'new', 60), 'new')
+
+    def test_many_computes_only_misses(self):
+        '''remember_many пересчитывает только отсутствующие ключи'''
+        remember('first', lambda: 1, 60)
+        calls = []
+
+        def compute(value):
+            calls.append(value)
+            return value
+
+        values = remember_many(
+            {'first': lambda: compute(10), 'second': lambda: compute(2)},
+            60)
+        self.assertEqual(values, {'first': 1, 'second': 2})
+        self.assertEqual(calls, [2])
+        self.assertEqual(remember('second', lambda: 3, 60), 2)
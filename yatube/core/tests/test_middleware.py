@@ -0,0 +1,55 @@
+from core.decorators import query_budget
+from core.middleware import (QueryBudgetExceeded, QueryBudgetMiddleware,
+                             fingerprint)
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+User = get_user_model()
+
+
+@query_budget(1)
+def greedy_view(request):
+    User.objects.count()
+    User.objects.count()
+    return HttpResponse()
+
+
+@query_budget(10)
+def repeating_view(request):
+    for user_id in range(4):
+        User.objects.filter(id=user_id).exists()
+    return HttpResponse()
+
+
+def run(view):
+    request = RequestFactory().get('/')
+    middleware = QueryBudgetMiddleware(lambda request: (
+        middleware.process_view(request, view, (), {}) or view(request)))
+    return middleware(request)
+
+
+class QueryBudgetMiddlewareTest(TestCase):
+    def test_server_timing(self):
+        '''Заголовок Server-Timing содержит число запросов'''
+        with self.settings(QUERY_BUDGET_STRICT=False):
+            response = run(greedy_view)
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_budget_exceeded(self):
+        '''Превышение бюджета поднимает исключение'''
+        with self.assertRaises(QueryBudgetExceeded):
+            run(greedy_view)
+
+    @override_settings(QUERY_BUDGET_STRICT=True, QUERY_BUDGET_DUPLICATES=2)
+    def test_duplicates_detected(self):
+        '''Повторяющийся SQL считается N+1'''
+        with self.assertRaisesMessage(QueryBudgetExceeded, '4 одинаковых'):
+            run(repeating_view)
+
+    def test_fingerprint(self):
+        '''Списки IN схлопываются в отпечатке'''
+        self.assertEqual(
+            fingerprint('SELECT 1 WHERE id IN (%s, %s, %s)'),
+            fingerprint('SELECT 1 WHERE id IN (%s)'))
@@ -0,0 +1,173 @@
+import itertools
+import os
+import tempfile
+import time
+
+from core import routers
+from core.decorators import use_replica
+from core.middleware import PIN_COOKIE, ReplicaMiddleware
+from core.models import Task
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, TestCase,
+                         override_settings)
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from posts.models import Post
+
+User = get_user_model()
+REPLICAS = ['replica_a', 'replica_b']
+REPLICA = 'replica_file'
+
+
+@use_replica
+def read_view(request):
+    return HttpResponse(str(routers._state.use_replicas))
+
+
+def write_view(request):
+    User.objects.create_user(username='writer')
+    return HttpResponse()
+
+
+def task_view(request):
+    Task.objects.create(name='ping', payload='[[], {}]',
+                        run_at=timezone.now())
+    response = HttpResponse()
+    patch_cache_control(response, public=True, max_age=60)
+    return response
+
+
+def public_write_view(request):
+    response = write_view(request)
+    patch_cache_control(response, public=True, max_age=60)
+    return response
+
+
+def run(view, **cookies):
+    factory = RequestFactory()
+    for name, value in cookies.items():
+        factory.cookies[name] = value
+    request = factory.get('/')
+    middleware = ReplicaMiddleware(lambda request: (
+        middleware.process_view(request, view, (), {}) or view(request)))
+    return middleware(request)
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        self.router = routers.replica_router()
+        self.router.down = {}
+        self.router.checked = {alias: time.monotonic() for alias in REPLICAS}
+        routers.begin(True)
+        self.router.counter = itertools.count()
+
+    def tearDown(self):
+        routers.end()
+
+    def reads(self):
+        '''Реплики, из которых читал один запрос.'''
+        routers.begin(True)
+        return {self.router.db_for_read(User) for _ in range(3)}
+
+    def test_round_robin(self):
+        '''Запросы получают реплики по кругу'''
+        reads = [self.reads() for _ in range(4)]
+        self.assertEqual(reads, [{alias} for alias in REPLICAS * 2])
+
+    def test_primary_outside_read_views(self):
+        '''Вне помеченных view чтение идет в основную базу'''
+        routers.begin(False)
+        self.assertIsNone(self.router.db_for_read(User))
+
+    def test_read_after_write(self):
+        '''После записи запрос читает из основной базы'''
+        self.assertEqual(self.router.db_for_write(User), 'default')
+        self.assertIsNone(self.router.db_for_read(User))
+
+    def test_unhealthy_replica_skipped(self):
+        '''Недоступная реплика пропускается'''
+        self.router.mark_down('replica_a')
+        reads = [self.reads() for _ in range(4)]
+        self.assertEqual(reads, [{'replica_b'}] * 4)
+
+
+class ReplicaMiddlewareTest(TestCase):
+    def test_write_pins_primary(self):
+        '''После записи пользователь закреплен за основной базой'''
+        response = run(write_view)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        pin = response.cookies[PIN_COOKIE].value
+        self.assertEqual(run(read_view, **{PIN_COOKIE: pin}).content, b'False')
+        self.assertEqual(run(read_view).content, b'True')
+
+    def test_service_write_not_pinned(self):
+        '''Постановка задачи в очередь не закрепляет пользователя'''
+        response = run(task_view)
+        self.assertTrue(Task.objects.exists())
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_public_response_without_cookie(self):
+        '''Публичный ответ не получает cookie даже после записи'''
+        response = run(public_write_view)
+        self.assertTrue(User.objects.filter(username='writer').exists())
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaDatabaseTest(TestCase):
+    '''Реплика — отдельный файл SQLite с теми же миграциями.'''
+
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_file = tempfile.NamedTemporaryFile(
+            suffix='.sqlite3', dir=settings.BASE_DIR, delete=False).name
+        connections.databases[REPLICA] = dict(
+            settings.DATABASES['default'], NAME=cls.replica_file)
+        call_command('migrate', database=REPLICA, verbosity=0)
+        # bulk_create без сигналов: их обработчики пишут в default.
+        User.objects.using(REPLICA).bulk_create(
+            [User(id=1, username='replica_author')])
+        Post.objects.using(REPLICA).bulk_create(
+            [Post(author_id=1, text='Пост из реплики')])
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections.databases[REPLICA]
+        os.remove(cls.replica_file)
+
+    def setUp(self):
+        author = User.objects.create_user(username='primary_author')
+        Post.objects.create(author=author, text='Пост из основной базы')
+
+    def test_reads_from_replica(self):
+        '''Ленты с use_replica читают из файла реплики'''
+        response = Client().get(reverse('posts:api_index'))
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('Пост из реплики', content)
+        self.assertNotIn('Пост из основной базы', content)
+
+    def test_writes_to_primary(self):
+        '''Запись идет в основную базу, реплика ее не видит'''
+        run(write_view)
+        self.assertTrue(User.objects.using('default').filter(
+            username='writer').exists())
+        self.assertFalse(User.objects.using(REPLICA).filter(
+            username='writer').exists())
+
+    def test_pinned_user_reads_primary(self):
+        '''После записи пользователь читает из основной базы'''
+        response = Client().get(reverse('posts:api_index'), HTTP_COOKIE=(
+            f'{PIN_COOKIE}={int(time.time()) + 60}'))
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('Пост из основной базы', content)
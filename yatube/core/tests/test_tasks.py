@@ -0,0 +1,80 @@
+from io import StringIO
+
+from core import tasks
+from core.models import Task
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+calls = []
+
+
+@tasks.task(max_attempts=2, retry_delay=0)
+def record(value, fail=False):
+    calls.append(value)
+    if fail:
+        raise ValueError(value)
+
+
+class TaskQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_and_run(self):
+        '''delay ставит задачу в очередь, run_tasks выполняет и удаляет'''
+        record.delay('a')
+        record.delay(value='b')
+        self.assertEqual(calls, [])
+        self.assertEqual(Task.objects.count(), 2)
+        out = StringIO()
+        call_command('run_tasks', '--once', '--workers', '1', stdout=out)
+        self.assertEqual(calls, ['a', 'b'])
+        self.assertFalse(Task.objects.exists())
+        self.assertIn('Выполнено задач: 2', out.getvalue())
+
+    def test_retry_then_fail(self):
+        '''Упавшая задача повторяется, после max_attempts — failed'''
+        record.delay('x', fail=True)
+        for attempt in (1, 2):
+            jobs = tasks.claim(10)
+            self.assertEqual(len(jobs), 1)
+            self.assertEqual(jobs[0].attempts, attempt)
+            with self.assertLogs('core.tasks', 'ERROR'):
+                self.assertFalse(tasks.execute(jobs[0]))
+        job = Task.objects.get()
+        self.assertEqual(job.status, Task.FAILED)
+        self.assertIn('ValueError', job.last_error)
+        self.assertEqual(tasks.claim(10), [])
+
+    def test_claimed_once(self):
+        '''Забранную задачу не получит другой воркер до конца аренды'''
+        record.delay('a')
+        self.assertEqual(len(tasks.claim(10)), 1)
+        self.assertEqual(tasks.claim(10), [])
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager(self):
+        '''В режиме TASKS_EAGER задача выполняется сразу'''
+        record.delay('now')
+        self.assertEqual(calls, ['now'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_arguments_must_be_json(self):
+        '''Аргументы, не сериализуемые в JSON, отклоняются сразу'''
+        with self.assertRaises(TypeError):
+            record.delay(object())
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+    TASKS_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class QueuedEmailTest(TestCase):
+    def test_email_sent_by_worker(self):
+        '''Письмо уходит только при выполнении задачи'''
+        mail.send_mail('Тема', 'Текст', 'from@yatube.ru', ['to@yatube.ru'])
+        self.assertEqual(len(mail.outbox), 0)
+        call_command('run_tasks', '--once', '--workers', '1',
+                     stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Тема')
+        self.assertEqual(mail.outbox[0].to, ['to@yatube.ru'])
@@ -0,0 +1,36 @@
+'''Ограничение размера загружаемых файлов.'''
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    '''Пропускает файл, как только он превысил UPLOAD_MAX_BYTES.
+
+    Стоит первым в FILE_UPLOAD_HANDLERS: остаток такого файла
+    читается из запроса и отбрасывается, не попадая ни в память,
+    ни на диск. Имена пропущенных полей — в oversized(request).
+    '''
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        if request is not None:
+            request.oversized_files = set()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.UPLOAD_MAX_BYTES:
+            self.request.oversized_files.add(self.field_name)
+            raise SkipFile()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def oversized(request):
+    '''Поля с пропущенными из-за размера файлами.'''
+    return getattr(request, 'oversized_files', set())
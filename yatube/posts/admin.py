@@ -3,10 +3,19 @@ from .models import Comment, Follow, Group, Post
 
 
 class GroupAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'title')
+    list_display = ('pk', 'title', 'posts_count')
     search_fields = ('title',)
+    list_per_page = 50
     empty_value_display = '-пусто-'
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('stats')
+
+    def posts_count(self, obj):
+        stats = getattr(obj, 'stats', None)
+        return stats.posts_count if stats else 0
+    posts_count.short_description = 'Постов'
+
 
 class PostAdmin(admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
@@ -0,0 +1,236 @@
+'''JSON API лент только для чтения и подписки.
+
+Ленты берут те же запросы, что и страницы сайта (queries.py), но
+выбирают через values() только запрошенные поля: ?fields=id,text.
+Страницы листаются по ?cursor= из поля next ответа, JSON
+отдается потоком.
+'''
+from functools import wraps
+
+import orjson
+from core.decorators import query_budget, use_replica
+from django.core.files.storage import default_storage
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_http_methods, require_safe
+
+from . import cards, feed, follows
+from .models import Group, Post, User
+from .paginators import NEXT, CursorPaginator
+from .queries import (COMMENT_ORDERING, FEED_ORDERING, HOT_ORDERING,
+                      POST_ORDERING, author_feed, follow_feed, group_feed,
+                      hot_feed, index_feed, post_comments)
+
+LIMIT = 20
+MAX_LIMIT = 100
+CONTENT_TYPE = 'application/json'
+
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+FEED_FIELDS = {
+    'id': 'post_id',
+    'text': 'post__text',
+    'pub_date': 'pub_date',
+    'author': 'post__author__username',
+    'group': 'post__group__slug',
+    'image': 'post__image',
+    'comments_count': 'post__comments_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+}
+CONVERTERS = {
+    'image': lambda name: default_storage.url(name) if name else None,
+}
+
+
+def json_response(data, status=200):
+    return HttpResponse(orjson.dumps(data), status=status,
+                        content_type=CONTENT_TYPE)
+
+
+def error(message, status):
+    return json_response({'error': message}, status=status)
+
+
+def login_required_json(view):
+    '''Как login_required, но вместо редиректа отвечает 401.'''
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error('Требуется вход.', 401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def serialize(row, fields, names):
+    return {name: CONVERTERS[name](row[fields[name]])
+            if name in CONVERTERS else row[fields[name]]
+            for name in names}
+
+
+class FeedPage:
+    '''Страница ленты из values().
+
+    Строки читаются сразу, пока запрос еще внутри middleware: так
+    чтение идет через реплики и попадает в бюджет запросов. Потоком
+    отдается только сериализация.
+    '''
+
+    def __init__(self, queryset, ordering, fields, names, cursor, limit):
+        self.fields = fields
+        self.names = names
+        paths = [fields[name] for name in names]
+        paths += [field.lstrip('-') for field in ordering
+                  if field.lstrip('-') not in paths]
+        paginator = CursorPaginator(queryset.values(*paths), limit, ordering)
+        direction, values = paginator.decode(cursor)
+        rows = list(paginator.page_queryset(
+            NEXT, values if direction == NEXT else None))
+        self.next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            self.next_cursor = paginator.encode(NEXT, rows[-1])
+        self.rows = rows
+
+    def __iter__(self):
+        for row in self.rows:
+            yield serialize(row, self.fields, self.names)
+
+
+def page_params(request, fields):
+    '''Поля, курсор и размер страницы из GET; ValueError при ошибке.'''
+    names = [name for name in request.GET.get('fields', '').split(',')
+             if name]
+    unknown = set(names) - set(fields)
+    if unknown:
+        raise ValueError('Неизвестные поля: ' + ', '.join(sorted(unknown)))
+    try:
+        limit = int(request.GET.get('limit', LIMIT))
+    except ValueError:
+        raise ValueError('limit должен быть числом.')
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f'limit должен быть от 1 до {MAX_LIMIT}.')
+    return names or list(fields), request.GET.get('cursor'), limit
+
+
+def stream(page):
+    yield b'{"results":['
+    for number, item in enumerate(page):
+        if number:
+            yield b','
+        yield orjson.dumps(item)
+    yield b'],"next":' + orjson.dumps(page.next_cursor) + b'}'
+
+
+def feed_response(request, queryset, ordering, fields=POST_FIELDS):
+    try:
+        names, cursor, limit = page_params(request, fields)
+    except ValueError as exc:
+        return error(str(exc), 400)
+    page = FeedPage(queryset, ordering, fields, names, cursor, limit)
+    return StreamingHttpResponse(stream(page), content_type=CONTENT_TYPE)
+
+
+@query_budget(2)
+@use_replica
+@require_safe
+def index(request):
+    return feed_response(request, index_feed(), POST_ORDERING)
+
+
+@query_budget(2)
+@use_replica
+@require_safe
+def hot(request):
+    return feed_response(request, hot_feed(), HOT_ORDERING)
+
+
+@query_budget(3)
+@use_replica
+@require_safe
+def group(request, slug):
+    group_id = cards.cached_id(Group, 'slug', slug)
+    if group_id is None:
+        return error('Группа не найдена.', 404)
+    return feed_response(request, group_feed(group_id), POST_ORDERING)
+
+
+@query_budget(3)
+@use_replica
+@require_safe
+def profile(request, username):
+    author_id = cards.cached_id(User, 'username', username)
+    if author_id is None:
+        return error('Автор не найден.', 404)
+    return feed_response(request, author_feed(author_id), POST_ORDERING)
+
+
+@query_budget(6)
+@use_replica
+@require_safe
+@login_required_json
+def follow_index(request):
+    feed.pull(request.user.id)
+    return feed_response(
+        request, follow_feed(request.user.id), FEED_ORDERING, FEED_FIELDS)
+
+
+@query_budget(4)
+@use_replica
+@require_safe
+def post_detail(request, post_id):
+    '''Пост и первая страница комментариев.'''
+    try:
+        names = page_params(request, POST_FIELDS)[0]
+    except ValueError as exc:
+        return error(str(exc), 400)
+    post = Post.objects.filter(pk=post_id).values(
+        *[POST_FIELDS[name] for name in names]).first()
+    if post is None:
+        return error('Пост не найден.', 404)
+    comments = FeedPage(post_comments(post_id), COMMENT_ORDERING,
+                        COMMENT_FIELDS, list(COMMENT_FIELDS), None, LIMIT)
+    data = serialize(post, POST_FIELDS, names)
+    data['comments'] = list(comments)
+    data['comments_next'] = comments.next_cursor
+    return json_response(data)
+
+
+@query_budget(2)
+@use_replica
+@require_safe
+def comments(request, post_id):
+    return feed_response(request, post_comments(post_id), COMMENT_ORDERING,
+                         COMMENT_FIELDS)
+
+
+@query_budget(16)
+@require_http_methods(['GET', 'POST', 'DELETE'])
+@login_required_json
+def follow(request, username):
+    '''Подписка на автора: GET — состояние, POST — подписаться,
+    DELETE — отписаться. Повторный запрос ничего не меняет.
+    '''
+    author = get_object_or_404(User.objects.only('id'), username=username)
+    changed = False
+    if request.method == 'POST':
+        changed = follows.follow(request.user.id, author.id)
+    elif request.method == 'DELETE':
+        changed = follows.unfollow(request.user.id, author.id)
+    return json_response({
+        'author': username,
+        'following': follows.is_following(request.user.id, author.id),
+        'changed': changed,
+        'followers': follows.follower_counts([author.id])[author.id],
+    })
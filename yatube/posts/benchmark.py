@@ -0,0 +1,150 @@
+'''Нагрузочный прогон основных view на сгенерированных данных.
+
+Данные создаются bulk_create, поэтому сигналы не срабатывают:
+ленты, счетчики и поисковый индекс заполняются после вставки
+теми же функциями, что используются в работе сайта.
+'''
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from faker import Faker
+
+from . import counters, feed, hot, search
+from .models import Comment, Follow, Group, Post, User
+
+VOLUMES = {
+    'users': 200,
+    'groups': 20,
+    'posts': 5000,
+    'follows': 2000,
+    'comments': 10000,
+}
+PERCENTILES = (50, 90, 95, 99)
+
+
+def seed(volumes, seed=0):
+    '''Наполняет базу случайными, но воспроизводимыми данными.'''
+    rng = random.Random(seed)
+    fake = Faker('ru_RU')
+    fake.seed_instance(seed)
+    User.objects.bulk_create(
+        [User(username=f'bench{number}', first_name=fake.first_name(),
+              last_name=fake.last_name())
+         for number in range(volumes['users'])])
+    Group.objects.bulk_create(
+        [Group(title=fake.sentence(nb_words=3)[:200], slug=f'bench{number}',
+               description=fake.paragraph())
+         for number in range(volumes['groups'])])
+    user_ids = list(User.objects.values_list('id', flat=True))
+    group_ids = list(Group.objects.values_list('id', flat=True)) + [None]
+    Post.objects.bulk_create(
+        [Post(author_id=rng.choice(user_ids), group_id=rng.choice(group_ids),
+              text=fake.paragraph(nb_sentences=5))
+         for _ in range(volumes['posts'])])
+    post_ids = list(Post.objects.values_list('id', flat=True))
+    Comment.objects.bulk_create(
+        [Comment(post_id=rng.choice(post_ids), author_id=rng.choice(user_ids),
+                 text=fake.sentence())
+         for _ in range(volumes['comments'])])
+    pairs = {tuple(rng.sample(user_ids, 2))
+             for _ in range(volumes['follows'])}
+    Follow.objects.bulk_create(
+        [Follow(user_id=user_id, author_id=author_id)
+         for user_id, author_id in pairs])
+    feed.rebuild()
+    counters.reconcile()
+    hot.recompute()
+    search.rebuild()
+
+
+def scenarios():
+    '''Запросы прогона: имя, метод, url и данные формы.'''
+    post = Post.objects.filter(group__isnull=False).order_by('-id').first()
+    reader = Follow.objects.values_list('user_id', flat=True).first()
+    return reader, [
+        ('index', 'get', reverse('posts:index'), None),
+        ('group_posts', 'get',
+         reverse('posts:group_list', args=[post.group.slug]), None),
+        ('profile', 'get',
+         reverse('posts:profile', args=[post.author.username]), None),
+        ('post_detail', 'get',
+         reverse('posts:post_detail', args=[post.id]), None),
+        ('follow_index', 'get', reverse('posts:follow_index'), None),
+        ('hot_posts', 'get', reverse('posts:hot'), None),
+        ('post_create', 'post', reverse('posts:post_create'),
+         {'text': 'Пост из нагрузочного прогона'}),
+        ('add_comment', 'post',
+         reverse('posts:add_comment', args=[post.id]),
+         {'text': 'Комментарий из нагрузочного прогона'}),
+    ]
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (
+        position - lower)
+
+
+def measure(client, method, url, data, requests, warmup):
+    '''Время и число запросов к БД по каждому запросу, пик памяти.
+
+    Память снимается отдельным запросом: tracemalloc заметно
+    замедляет выполнение и исказил бы время ответа.
+    '''
+    for _ in range(warmup):
+        getattr(client, method)(url, data)
+    timings, queries = [], []
+    for _ in range(requests):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(len(captured))
+    tracemalloc.start()
+    getattr(client, method)(url, data)
+    peak = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+    result = {
+        'status': response.status_code,
+        'requests': requests,
+        'queries': max(queries),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'peak_kib': round(peak, 1),
+    }
+    for percent in PERCENTILES:
+        result[f'p{percent}_ms'] = round(percentile(timings, percent), 3)
+    return result
+
+
+def run(requests=50, warmup=5):
+    '''Прогоняет все сценарии и возвращает результаты по view.'''
+    cache.clear()
+    reader, cases = scenarios()
+    client = Client()
+    client.force_login(User.objects.get(id=reader))
+    return {name: measure(client, method, url, data, requests, warmup)
+            for name, method, url, data in cases}
+
+
+def compare(before, after):
+    '''Изменение p50, p95 и числа запросов относительно прошлого прогона.'''
+    changes = {}
+    for name, current in after.items():
+        previous = before.get(name)
+        if previous is None:
+            continue
+        changes[name] = {
+            key: round(current[key] - previous[key], 3)
+            for key in ('p50_ms', 'p95_ms', 'queries')
+        }
+    return changes
@@ -0,0 +1,106 @@
+import hashlib
+import uuid
+from functools import partial
+
+from core.cache import remember, remember_many
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+VERSION_KEY = 'version:{}:{}'
+ID_KEY = 'id:{}:{}'
+CARD_KEY = 'post_card:{}:{}'
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+
+
+def bump(kind, pk):
+    '''Меняет версию объекта: все карточки с ним станут промахами.'''
+    cache.set(VERSION_KEY.format(kind, pk), uuid.uuid4().hex, None)
+
+
+def versions(keys):
+    '''Текущие версии по ключам; отсутствующие создаются заново.
+
+    Новая версия для вытесненного ключа гарантирует, что устаревшая
+    карточка не будет отдана из кэша.
+    '''
+    found = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return found
+
+
+def version_keys(post):
+    keys = [VERSION_KEY.format('post', post.pk),
+            VERSION_KEY.format('user', post.author_id)]
+    if post.group_id:
+        keys.append(VERSION_KEY.format('group', post.group_id))
+    return keys
+
+
+def etag(post, *extra):
+    '''Хэш версий поста, автора и группы вместе с extra.'''
+    keys = version_keys(post)
+    found = versions(keys)
+    raw = ':'.join(
+        [found[key] for key in keys] + [str(value) for value in extra])
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def feed_scopes(post):
+    return ['index', f'group:{post.group_id}', f'user:{post.author_id}']
+
+
+def bump_feeds(*scopes):
+    '''Меняет версии лент; scope 'all' относится ко всем лентам.'''
+    cache.set_many(
+        {VERSION_KEY.format('feed', scope): uuid.uuid4().hex
+         for scope in scopes}, None)
+
+
+def feed_etag(scope):
+    '''Валидатор ленты: хэш ее версии и общей версии всех лент.'''
+    keys = [VERSION_KEY.format('feed', scope),
+            VERSION_KEY.format('feed', 'all')]
+    found = versions(keys)
+    raw = ':'.join(found[key] for key in keys)
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def id_key(model, field, value):
+    digest = hashlib.md5(f'{field}:{value}'.encode()).hexdigest()
+    return ID_KEY.format(model._meta.label_lower, digest)
+
+
+def cached_id(model, field, value):
+    '''id объекта по уникальному полю, например группы по slug.
+
+    Ключ нужно удалять при изменении поля: это делают обработчики
+    сохранения и удаления групп и пользователей в signals.py.
+    '''
+    pk = remember(
+        id_key(model, field, value),
+        lambda: model.objects.filter(**{field: value}).values_list(
+            'pk', flat=True).first() or 0,
+        settings.POST_CARD_TIMEOUT)
+    return pk or None
+
+
+def render_cards(posts):
+    '''HTML карточек постов: два get_many и рендер только промахов.
+
+    Промахи рендерятся через remember, поэтому одну карточку после
+    смены версии не рендерят одновременно все процессы.
+    '''
+    posts = list(posts)
+    found = versions(list({
+        key for post in posts for key in version_keys(post)}))
+    keys = [CARD_KEY.format(post.pk, ':'.join(
+        found[key] for key in version_keys(post))) for post in posts]
+    cards = remember_many(
+        {key: partial(render_to_string, CARD_TEMPLATE, {'post': post})
+         for post, key in zip(posts, keys)},
+        settings.POST_CARD_TIMEOUT)
+    return [cards[key] for key in keys]
@@ -0,0 +1,116 @@
+from django.db import transaction
+from django.db.models import (Count, F, IntegerField, Max, OuterRef,
+                              Subquery)
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import (Comment, Follow, Group, GroupAuthor, GroupStats, Post,
+                     User, UserStats)
+
+
+def _shift(field, delta):
+    return Greatest(F(field) + delta, 0)
+
+
+def change_user(user_id, **deltas):
+    '''Сдвигает счетчики пользователя на deltas одним UPDATE.
+
+    Строка создается только при увеличении: уменьшение без строки
+    приходит от каскадного удаления самого пользователя.
+    '''
+    updates = {field: _shift(field, delta) for field, delta in deltas.items()}
+    if (not UserStats.objects.filter(user_id=user_id).update(**updates)
+            and any(delta > 0 for delta in deltas.values())):
+        UserStats.objects.get_or_create(user_id=user_id)
+        UserStats.objects.filter(user_id=user_id).update(**updates)
+
+
+def change_post(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=_shift('comments_count', delta))
+
+
+def _last_post(group_id):
+    return Subquery(Post.objects.filter(group_id=group_id).order_by(
+        '-pub_date').values('pub_date')[:1])
+
+
+def change_group(group_id, delta):
+    '''Сдвигает число постов группы и обновляет дату последнего поста.
+
+    Дата берется из индекса (group, -pub_date) тем же UPDATE, поэтому
+    удаление последнего поста тоже учитывается. Как и в change_user,
+    строка создается только при увеличении: группы может уже не быть.
+    '''
+    updates = {'posts_count': _shift('posts_count', delta),
+               'last_post_date': _last_post(group_id)}
+    if (not GroupStats.objects.filter(group_id=group_id).update(**updates)
+            and delta > 0):
+        GroupStats.objects.get_or_create(group_id=group_id)
+        GroupStats.objects.filter(group_id=group_id).update(**updates)
+
+
+def group_author_posted(group_id, author_id, pub_date):
+    '''Отмечает пост автора в группе для подсчета активных авторов.'''
+    if not GroupAuthor.objects.filter(
+            group_id=group_id, author_id=author_id,
+            last_post_date__lt=pub_date).update(last_post_date=pub_date):
+        GroupAuthor.objects.bulk_create(
+            [GroupAuthor(group_id=group_id, author_id=author_id,
+                         last_post_date=pub_date)],
+            ignore_conflicts=True)
+
+
+def group_author_left(group_id, author_id):
+    '''Пост автора ушел из группы: дата его последнего поста там
+    пересчитывается, а без постов строка удаляется.
+    '''
+    last = Post.objects.filter(
+        group_id=group_id, author_id=author_id).aggregate(
+        last=Max('pub_date'))['last']
+    rows = GroupAuthor.objects.filter(group_id=group_id, author_id=author_id)
+    if last is None:
+        rows.delete()
+    else:
+        rows.update(last_post_date=last)
+
+
+def _count(model, field, outer):
+    subquery = (model.objects.filter(**{field: OuterRef(outer)})
+                .order_by().values(field)
+                .annotate(total=Count('pk')).values('total'))
+    return Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
+
+
+def reconcile():
+    '''Пересчитывает все счетчики по исходным таблицам.
+
+    Возвращает число созданных строк UserStats и GroupStats.
+    '''
+    missing = User.objects.filter(stats__isnull=True).values_list(
+        'pk', flat=True)
+    created = UserStats.objects.bulk_create(
+        [UserStats(user_id=pk) for pk in missing.iterator()],
+        ignore_conflicts=True)
+    missing = Group.objects.filter(stats__isnull=True).values_list(
+        'pk', flat=True)
+    created += GroupStats.objects.bulk_create(
+        [GroupStats(group_id=pk) for pk in missing.iterator()],
+        ignore_conflicts=True)
+    authors = Post.objects.filter(group__isnull=False).order_by().values(
+        'group_id', 'author_id').annotate(last=Max('pub_date'))
+    with transaction.atomic():
+        UserStats.objects.update(
+            posts_count=_count(Post, 'author', 'user_id'),
+            followers_count=_count(Follow, 'author', 'user_id'),
+            following_count=_count(Follow, 'user', 'user_id'))
+        Post.objects.update(comments_count=_count(Comment, 'post', 'pk'))
+        GroupStats.objects.update(
+            posts_count=_count(Post, 'group', 'group_id'),
+            last_post_date=_last_post(OuterRef('group_id')))
+        GroupAuthor.objects.all().delete()
+        GroupAuthor.objects.bulk_create(
+            [GroupAuthor(group_id=row['group_id'],
+                         author_id=row['author_id'],
+                         last_post_date=row['last'])
+             for row in authors.iterator()])
+    return len(created)
@@ -0,0 +1,102 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+from django.db.models import Max
+
+from . import follows
+from .models import FeedEntry, Follow, Post
+
+# Запас на посты, закоммиченные позже уже подтянутых.
+PULL_OVERLAP = timedelta(minutes=1)
+
+
+def follower_count(author_id):
+    return follows.follower_counts([author_id])[author_id]
+
+
+def _entries(user_ids, posts):
+    '''Записи, раскладывающие каждый из posts в ленты user_ids.'''
+    return [FeedEntry(user_id=user_id, post_id=post.id,
+                      author_id=post.author_id, pub_date=post.pub_date)
+            for user_id in user_ids for post in posts]
+
+
+def fan_out(post):
+    '''Раскладывает новый пост по лентам подписчиков автора.
+
+    Посты авторов, у которых подписчиков больше FEED_FANOUT_LIMIT,
+    не раскладываются: их забирает pull() при чтении ленты.
+    '''
+    if follower_count(post.author_id) > settings.FEED_FANOUT_LIMIT:
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    FeedEntry.objects.bulk_create(
+        _entries(followers.iterator(), [post]), ignore_conflicts=True)
+
+
+def backfill(user_id, author_id):
+    '''Добавляет в ленту последние посты нового автора из подписок.'''
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id').only('id', 'author_id', 'pub_date')
+    FeedEntry.objects.bulk_create(
+        _entries([user_id], posts[:settings.FEED_BACKFILL_LIMIT]),
+        ignore_conflicts=True)
+
+
+def drop(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def pull(user_id):
+    '''Подтягивает в ленту новые посты популярных авторов.
+
+    Отсчет идет от самой свежей записи их постов в ленте, без записей
+    берутся последние FEED_BACKFILL_LIMIT постов. Читается основная
+    база: по отстающей реплике отсчет ушел бы вперед и пропустил
+    посты, которых она еще не видит.
+    '''
+    counts = follows.follower_counts(follows.following(user_id))
+    authors = [author_id for author_id, count in counts.items()
+               if count > settings.FEED_FANOUT_LIMIT]
+    if not authors:
+        return
+    since = FeedEntry.objects.using(DEFAULT_DB_ALIAS).filter(
+        user_id=user_id, author_id__in=authors).aggregate(
+        last=Max('pub_date'))['last']
+    posts = Post.objects.using(DEFAULT_DB_ALIAS).filter(
+        author_id__in=authors).order_by('-pub_date', '-id').only(
+        'id', 'author_id', 'pub_date')
+    if since is not None:
+        since -= PULL_OVERLAP
+        posts = posts.filter(pub_date__gte=since).exclude(
+            pk__in=FeedEntry.objects.filter(
+                user_id=user_id, pub_date__gte=since).values('post_id'))
+    entries = _entries([user_id], posts[:settings.FEED_BACKFILL_LIMIT])
+    # Без новых постов чтение ленты ничего не пишет и не закрепляет
+    # пользователя за основной базой.
+    if entries:
+        FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def rebuild():
+    '''Заполняет ленты по всем подпискам, например после импорта.
+
+    Одним INSERT ... SELECT: каждому подписчику достаются последние
+    FEED_BACKFILL_LIMIT постов автора, как при backfill().
+    '''
+    ops = connection.ops
+    sql = (
+        f'{ops.insert_statement(ignore_conflicts=True)} '
+        f'{FeedEntry._meta.db_table} (user_id, post_id, author_id, pub_date) '
+        f'SELECT follow.user_id, post.id, post.author_id, post.pub_date '
+        f'FROM {Follow._meta.db_table} AS follow '
+        f'JOIN (SELECT id, author_id, pub_date, ROW_NUMBER() OVER ('
+        f'PARTITION BY author_id ORDER BY pub_date DESC, id DESC) AS place '
+        f'FROM {Post._meta.db_table}) AS post '
+        f'ON post.author_id = follow.author_id '
+        f'WHERE post.place <= %s '
+        f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}')
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(sql, [settings.FEED_BACKFILL_LIMIT])
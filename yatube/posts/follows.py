@@ -0,0 +1,114 @@
+'''Граф подписок в общем кэше.
+
+Для каждого пользователя хранится frozenset id авторов, на которых
+он подписан, для каждого автора — число подписчиков. Проверки
+«подписан ли» и «на кого из этих авторов подписан» не обращаются
+к БД, пока множество есть в кэше.
+
+follow и unfollow меняют подписку одним запросом к posts_follow
+и безопасны при повторных и параллельных вызовах: уникальность
+пары держит индекс unique_combination.
+'''
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.db.models.signals import post_delete, post_save
+
+from .models import Follow, UserStats
+
+FOLLOWING_KEY = 'following:{}'
+FOLLOWERS_KEY = 'followers:{}'
+
+
+def following(user_id):
+    '''Множество id авторов, на которых подписан user_id.'''
+    if not user_id:
+        return frozenset()
+    return cache.get_or_set(
+        FOLLOWING_KEY.format(user_id),
+        lambda: frozenset(Follow.objects.filter(user_id=user_id).values_list(
+            'author_id', flat=True)),
+        settings.FOLLOW_GRAPH_TIMEOUT)
+
+
+def is_following(user_id, author_id):
+    return author_id in following(user_id)
+
+
+def followed_among(user_id, author_ids):
+    '''Те из author_ids, на кого подписан user_id.'''
+    return following(user_id).intersection(author_ids)
+
+
+def follower_counts(author_ids):
+    '''Число подписчиков каждого автора: один get_many и один запрос
+    к UserStats на промахи.
+    '''
+    keys = {FOLLOWERS_KEY.format(author_id): author_id
+            for author_id in set(author_ids)}
+    found = cache.get_many(list(keys))
+    counts = {keys[key]: count for key, count in found.items()}
+    missing = [author_id for key, author_id in keys.items()
+               if key not in found]
+    if missing:
+        loaded = dict(UserStats.objects.filter(
+            user_id__in=missing).values_list('user_id', 'followers_count'))
+        loaded = {author_id: loaded.get(author_id, 0)
+                  for author_id in missing}
+        cache.set_many(
+            {FOLLOWERS_KEY.format(author_id): count
+             for author_id, count in loaded.items()},
+            settings.FOLLOW_GRAPH_TIMEOUT)
+        counts.update(loaded)
+    return counts
+
+
+def changed(user_id, author_id):
+    '''Сбрасывает записи графа после подписки или отписки.
+
+    Сброс повторяется после коммита: иначе параллельный запрос мог
+    бы успеть положить в кэш состояние до изменения.
+    '''
+    keys = [FOLLOWING_KEY.format(user_id), FOLLOWERS_KEY.format(author_id)]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _write(sql, params, signal, **kwargs):
+    '''Выполняет запрос к posts_follow; если он изменил строку,
+    в той же транзакции отправляет signal, как это сделали бы
+    save и delete модели.
+    '''
+    using = router.db_for_write(Follow)
+    with transaction.atomic(using=using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(sql, params)
+            changed = cursor.rowcount == 1
+        if changed:
+            signal.send(Follow, instance=Follow(
+                user_id=params[0], author_id=params[1]), using=using,
+                **kwargs)
+    return changed
+
+
+def follow(user_id, author_id):
+    '''Подписывает user_id на author_id. True, если подписки не было.
+
+    INSERT ... ON CONFLICT DO NOTHING не создает дубль, даже если
+    два запроса пришли одновременно.
+    '''
+    if user_id == author_id:
+        return False
+    return _write(
+        f'INSERT INTO {Follow._meta.db_table} (user_id, author_id) '
+        f'VALUES (%s, %s) ON CONFLICT (user_id, author_id) DO NOTHING',
+        [user_id, author_id], post_save,
+        created=True, update_fields=None, raw=False)
+
+
+def unfollow(user_id, author_id):
+    '''Отписывает user_id от author_id. True, если подписка была.'''
+    return _write(
+        f'DELETE FROM {Follow._meta.db_table} '
+        f'WHERE user_id = %s AND author_id = %s',
+        [user_id, author_id], post_delete)
@@ -1,4 +1,6 @@
 from django import forms
+from django.conf import settings
+from . import images
 from .models import Comment, Post
 
 
@@ -7,6 +9,20 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def __init__(self, *args, oversized=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.oversized = oversized
+
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if 'image' in self.oversized:
+            raise forms.ValidationError(
+                f'Файл больше {settings.UPLOAD_MAX_BYTES // 2 ** 20} МБ.',
+                code='size')
+        if image and 'image' in self.files:
+            images.validate(image)
+        return image
+
     def clean_text(self):
         text = self.cleaned_data['text']
         if text == '':
@@ -0,0 +1,44 @@
+'''Каталог групп.
+
+Число постов и дата последнего поста хранятся в GroupStats, авторы,
+писавшие в группу, — в GroupAuthor; обе таблицы обновляются
+сигналами постов. Каталог собирается одним запросом и лежит в кэше,
+пока группы или их счетчики не изменятся; срок хранения ограничен,
+потому что окно активных авторов сдвигается со временем.
+'''
+from datetime import timedelta
+
+from core.cache import remember
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Group
+
+DIRECTORY_KEY = 'group_directory'
+
+
+def directory():
+    '''Группы по алфавиту со счетчиками, список словарей.'''
+    return remember(DIRECTORY_KEY, build, settings.GROUP_DIRECTORY_TIMEOUT)
+
+
+def build():
+    since = timezone.now() - timedelta(days=settings.GROUP_ACTIVE_DAYS)
+    groups = list(Group.objects.order_by('title').annotate(
+        active_authors=Count(
+            'authors', filter=Q(authors__last_post_date__gte=since))
+    ).values('title', 'slug', 'description', 'stats__posts_count',
+             'stats__last_post_date', 'active_authors'))
+    for group in groups:
+        group['posts_count'] = group.pop('stats__posts_count') or 0
+        group['last_post_date'] = group.pop('stats__last_post_date')
+    return groups
+
+
+def changed():
+    '''Сбрасывает каталог сейчас и после коммита.'''
+    cache.delete(DIRECTORY_KEY)
+    transaction.on_commit(lambda: cache.delete(DIRECTORY_KEY))
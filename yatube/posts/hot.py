@@ -0,0 +1,86 @@
+'''Рейтинг «горячих» постов.
+
+Очки поста складываются из самого поста, его комментариев и числа
+подписчиков автора, рейтинг — очки, деленные на
+(возраст в часах + 2) ** HOT_GRAVITY. Рейтинг хранится в
+Post.hot_score с частичным индексом, поэтому лента /hot/ читает
+начало индекса. Новый комментарий сразу добавляет к рейтингу свой
+вклад, затухание со временем пересчитывает команда
+update_hot_scores. Посты старше HOT_WINDOW часов получают 0
+и выпадают из ленты.
+'''
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import follows
+from .models import Post, UserStats
+
+COMMENT_WEIGHT = 1.0
+FOLLOWER_WEIGHT = 0.5
+
+
+def points(comments_count, followers_count):
+    return (1 + COMMENT_WEIGHT * comments_count
+            + FOLLOWER_WEIGHT * math.log2(1 + followers_count))
+
+
+def decay(pub_date, now=None):
+    '''Множитель затухания; 0 за пределами HOT_WINDOW.'''
+    now = now or timezone.now()
+    hours = max((now - (pub_date or now)).total_seconds() / 3600, 0)
+    if hours > settings.HOT_WINDOW:
+        return 0
+    return (hours + 2) ** -settings.HOT_GRAVITY
+
+
+def score(post, followers_count, now=None):
+    return points(post.comments_count, followers_count) * decay(
+        post.pub_date, now)
+
+
+def initial(post):
+    '''Рейтинг нового поста, до сохранения.'''
+    followers = follows.follower_counts([post.author_id])[post.author_id]
+    return score(post, followers)
+
+
+def comment_added(comment):
+    '''Сразу добавляет вклад нового комментария к рейтингу поста.'''
+    weight = COMMENT_WEIGHT * decay(comment.post.pub_date)
+    if weight:
+        Post.objects.filter(pk=comment.post_id).update(
+            hot_score=F('hot_score') + weight)
+
+
+def recompute(batch_size=1000, now=None):
+    '''Пересчитывает рейтинг постов в окне и обнуляет вышедшие из него.
+
+    Возвращает число пересчитанных постов.
+    '''
+    now = now or timezone.now()
+    since = now - timedelta(hours=settings.HOT_WINDOW)
+    posts = Post.objects.filter(pub_date__gte=since).only(
+        'id', 'pub_date', 'comments_count', 'author_id')
+    followers = dict(UserStats.objects.filter(
+        user_id__in=posts.values('author_id')).values_list(
+        'user_id', 'followers_count'))
+    total = 0
+    with transaction.atomic():
+        Post.objects.filter(pub_date__lt=since, hot_score__gt=0).update(
+            hot_score=0)
+        batch = []
+        for post in posts.iterator(chunk_size=batch_size):
+            post.hot_score = score(post, followers.get(post.author_id, 0), now)
+            batch.append(post)
+            if len(batch) == batch_size:
+                Post.objects.bulk_update(batch, ['hot_score'])
+                total += len(batch)
+                batch = []
+        Post.objects.bulk_update(batch, ['hot_score'])
+        total += len(batch)
+    return total
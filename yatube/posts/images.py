@@ -0,0 +1,105 @@
+'''Проверка и перекодирование картинок постов.
+
+Форма смотрит только заголовок файла: Pillow читает формат
+и размеры, не декодируя пиксели. Декодирование идет в фоновой
+задаче process: картинка поворачивается по EXIF, уменьшается
+до IMAGE_STORED_SIDE, сохраняется без метаданных прогрессивным
+JPEG (или PNG, если есть прозрачность) и заменяет оригинал.
+GIF не перекодируется, чтобы не потерять анимацию.
+'''
+import os
+from io import BytesIO
+
+from core.tasks import task
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from . import cards, thumbnails
+from .models import Post
+
+FORMATS = ('JPEG', 'PNG', 'GIF')
+
+
+def validate(upload):
+    '''Проверяет формат и размеры загруженной картинки.
+
+    upload.image — картинка, открытая forms.ImageField без
+    декодирования.
+    '''
+    image = getattr(upload, 'image', None)
+    if image is None:
+        return
+    if image.format not in FORMATS:
+        raise ValidationError(
+            'Поддерживаются картинки JPEG, PNG и GIF.', code='format')
+    width, height = image.size
+    if (max(width, height) > settings.IMAGE_MAX_SIDE
+            or width * height > settings.IMAGE_MAX_PIXELS):
+        raise ValidationError(
+            f'Картинка слишком большая: {width}×{height}, допустимо '
+            f'не больше {settings.IMAGE_MAX_SIDE} точек по стороне.',
+            code='dimensions')
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info)
+
+
+def reencode(name):
+    '''Сохраняет перекодированную копию и возвращает ее имя;
+    для GIF возвращает name.
+    '''
+    side = settings.IMAGE_STORED_SIDE
+    with default_storage.open(name) as source:
+        image = Image.open(source)
+        if image.format == 'GIF':
+            return name
+        # JPEG декодируется сразу в уменьшенном масштабе.
+        image.draft('RGB', (side, side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((side, side))
+        buffer = BytesIO()
+        if has_alpha(image):
+            image.convert('RGBA').save(buffer, 'PNG', optimize=True)
+            extension = 'png'
+        else:
+            image.convert('RGB').save(
+                buffer, 'JPEG', quality=settings.IMAGE_JPEG_QUALITY,
+                optimize=True, progressive=True)
+            extension = 'jpg'
+    return default_storage.save(
+        f'{os.path.splitext(name)[0]}.{extension}',
+        ContentFile(buffer.getvalue()))
+
+
+@task(max_attempts=3, retry_delay=30)
+def process(post_id, name):
+    '''Перекодирует картинку поста и ставит в очередь миниатюры.'''
+    if not Post.objects.filter(pk=post_id, image=name).exists():
+        return
+    new_name = reencode(name)
+    if new_name != name:
+        if not Post.objects.filter(pk=post_id, image=name).update(
+                image=new_name):
+            default_storage.delete(new_name)
+            return
+        default_storage.delete(name)
+        cards.bump('post', post_id)
+    cache.delete(thumbnails.pending_key(name))
+    thumbnails.schedule(post_id, new_name)
+
+
+def schedule(post_id, name):
+    '''Ставит обработку новой картинки в очередь.
+
+    Миниатюры оригинала не нужны: отметка в кэше не даст шаблонам
+    заказать их, пока картинка не перекодирована.
+    '''
+    cache.add(thumbnails.pending_key(name), True,
+              settings.THUMBNAIL_PENDING_TIMEOUT)
+    process.delay(post_id, name)
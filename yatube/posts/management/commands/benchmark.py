@@ -0,0 +1,69 @@
+import json
+import subprocess
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import (setup_test_environment,
+                               teardown_test_environment)
+from django.utils import timezone
+from posts import benchmark
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный прогон view на отдельной тестовой базе: '
+            'перцентили времени ответа, запросы к БД и память.')
+
+    def add_arguments(self, parser):
+        for name, default in benchmark.VOLUMES.items():
+            parser.add_argument(f'--{name}', type=int, default=default)
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Сохранить тестовую базу и данные для следующих прогонов.')
+        parser.add_argument('--output', help='Файл для результатов в JSON.')
+        parser.add_argument(
+            '--compare', help='JSON прошлого прогона для сравнения.')
+
+    def handle(self, *args, **options):
+        volumes = {name: options[name] for name in benchmark.VOLUMES}
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            if not Post.objects.exists():
+                benchmark.seed(volumes, options['seed'])
+            results = benchmark.run(options['requests'], options['warmup'])
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+        report = {
+            'commit': self.commit(),
+            'created': timezone.now().isoformat(),
+            'vendor': connection.vendor,
+            'volumes': volumes,
+            'results': results,
+        }
+        if options['compare']:
+            with open(options['compare']) as previous:
+                report['changes'] = benchmark.compare(
+                    json.load(previous)['results'], results)
+        data = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(data + '\n')
+        else:
+            self.stdout.write(data)
+
+    @staticmethod
+    def commit():
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,73 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from posts import queries
+from posts.paginators import NEXT, CursorPaginator
+from posts.views import LIMIT
+
+# Признаки полного сканирования таблицы или сортировки без индекса.
+BAD_PLANS = {
+    'sqlite': (
+        re.compile(r'USE TEMP B-TREE FOR ORDER BY'),
+        re.compile(r'\bSCAN (TABLE )?\S+( AS \S+)?$', re.MULTILINE),
+    ),
+    'postgresql': (
+        re.compile(r'\bSeq Scan\b'),
+        re.compile(r'^\s*(->\s*)?Sort\b', re.MULTILINE),
+    ),
+}
+
+
+def feed_shapes():
+    '''Запросы, которые формируют страницы лент.'''
+    return {
+        'index': (queries.index_feed(), queries.POST_ORDERING),
+        'group_posts': (queries.group_feed(1), queries.POST_ORDERING),
+        'profile': (queries.author_feed(1), queries.POST_ORDERING),
+        'post_detail': (queries.post_comments(1), queries.COMMENT_ORDERING),
+        'follow_index': (queries.follow_feed(1), queries.FEED_ORDERING),
+        'hot_posts': (queries.hot_feed(), queries.HOT_ORDERING),
+    }
+
+
+def sample_cursor(ordering):
+    '''Значения ключа для запроса второй страницы.'''
+    return [timezone.now() if field.lstrip('-') == 'pub_date' else 1
+            for field in ordering]
+
+
+def bad_plan(plan, vendor):
+    return any(pattern.search(plan) for pattern in BAD_PLANS[vendor])
+
+
+class Command(BaseCommand):
+    help = ('Проверяет через EXPLAIN, что запросы лент используют индексы '
+            'и не сортируют таблицу целиком.')
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in BAD_PLANS:
+            raise CommandError(f'СУБД {vendor} не поддерживается.')
+        failed = []
+        with transaction.atomic():
+            if vendor == 'postgresql':
+                # На маленькой базе планировщик и так выберет Seq Scan.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+                    cursor.execute('SET LOCAL enable_sort = off')
+            for name, (queryset, ordering) in feed_shapes().items():
+                paginator = CursorPaginator(queryset, LIMIT, ordering)
+                for values in (None, sample_cursor(ordering)):
+                    plan = paginator.page_queryset(NEXT, values).explain()
+                    if bad_plan(plan, vendor):
+                        failed.append(name)
+                        self.stdout.write(self.style.ERROR(
+                            f'{name}: полное сканирование\n{plan}'))
+                        break
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'{name}: OK'))
+        if failed:
+            raise CommandError(
+                'Запросы без подходящего индекса: ' + ', '.join(failed))
@@ -0,0 +1,49 @@
+import sys
+
+from django.core.management.base import BaseCommand
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Потоково выгружает группы, посты, комментарии или подписки '
+            'в JSON Lines или CSV.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=transfer.MODELS)
+        parser.add_argument('--format', choices=transfer.FORMATS,
+                            default='jsonl')
+        parser.add_argument('--output', help='Файл; по умолчанию stdout.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Дописать файл, продолжив с id из файла .checkpoint.')
+
+    def handle(self, *args, **options):
+        name, fmt = options['model'], options['format']
+        output_path = options['output']
+        checkpoint = output_path and output_path + '.checkpoint'
+        after = 0
+        if options['resume'] and checkpoint:
+            after = transfer.read_checkpoint(checkpoint)
+        rows = transfer.export_rows(name, after, options['chunk_size'])
+        fields = transfer.MODELS[name][1]
+        if output_path is None:
+            transfer.write(rows, sys.stdout, fmt, fields)
+            return
+        mode = 'a' if after else 'w'
+        total = 0
+        with open(output_path, mode, newline='') as output:
+            header = not after
+            while True:
+                chunk = [row for _, row in zip(
+                    range(options['chunk_size']), rows)]
+                if not chunk:
+                    break
+                after = transfer.write(chunk, output, fmt, fields, header)
+                header = False
+                output.flush()
+                transfer.write_checkpoint(checkpoint, after)
+                total += len(chunk)
+                self.stderr.write(f'{name}: выгружено {total}, id {after}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{name}: выгружено строк {total}.'))
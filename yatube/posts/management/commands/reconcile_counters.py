@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from posts.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики постов, комментариев и подписок.'
+
+    def handle(self, *args, **options):
+        created = reconcile()
+        self.stdout.write(self.style.SUCCESS(
+            f'Счетчики пересчитаны, новых записей: {created}.'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from posts.hot import recompute
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рейтинг постов для ленты /hot/ с учетом '
+            'затухания. Запускается по расписанию, например раз в 10 минут.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = recompute(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитан рейтинг постов: {total}.'))
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from posts.search import get_index
+
+    backend = get_index(schema_editor.connection.vendor)
+    if backend is None:
+        return
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    with schema_editor.connection.cursor() as cursor:
+        backend.create(cursor)
+        for post in Post.objects.only('id', 'text').iterator():
+            backend.save(cursor, post.pk * 2, post.pk, post.text)
+        for comment in Comment.objects.only(
+                'id', 'post_id', 'text').iterator():
+            backend.save(
+                cursor, comment.pk * 2 + 1, comment.post_id, comment.text)
+
+
+def drop_search_index(apps, schema_editor):
+    from posts.search import get_index
+
+    backend = get_index(schema_editor.connection.vendor)
+    if backend is None:
+        return
+    with schema_editor.connection.cursor() as cursor:
+        backend.drop(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+from django.db.models import Count, IntegerField, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(model, field, outer):
+    subquery = model.objects.filter(**{field: OuterRef(outer)}).order_by(
+        ).values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
+
+
+def dedupe_follows(apps, schema_editor):
+    '''Оставляет по одной подписке на пару (user, author) и создает
+    уникальный индекс, если в базе его нет.
+    '''
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    first = Follow.objects.values('user', 'author').annotate(
+        first_id=Min('id')).values('first_id')
+    deleted = Follow.objects.exclude(id__in=Subquery(first))._raw_delete(
+        schema_editor.connection.alias)
+    if deleted:
+        UserStats.objects.update(
+            followers_count=_count(Follow, 'author', 'user_id'),
+            following_count=_count(Follow, 'user', 'user_id'))
+    connection = schema_editor.connection
+    table = Follow._meta.db_table
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    if not any(info['unique'] and info['columns'] == ['user_id', 'author_id']
+               for info in constraints.values()):
+        for constraint in Follow._meta.constraints:
+            schema_editor.add_constraint(Follow, constraint)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_follows, migrations.RunPython.noop),
+    ]
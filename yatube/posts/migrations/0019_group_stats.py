@@ -0,0 +1,69 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:10
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def fill_group_stats(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    GroupStats = apps.get_model('posts', 'GroupStats')
+    GroupAuthor = apps.get_model('posts', 'GroupAuthor')
+    GroupStats.objects.bulk_create(
+        [GroupStats(group_id=pk)
+         for pk in Group.objects.values_list('pk', flat=True).iterator()])
+    posts = Post.objects.filter(group_id=OuterRef('group_id')).order_by()
+    GroupStats.objects.update(
+        posts_count=Coalesce(Subquery(
+            posts.values('group_id').annotate(total=Count('pk')).values(
+                'total'), output_field=IntegerField()), 0),
+        last_post_date=Subquery(
+            posts.order_by('-pub_date').values('pub_date')[:1]))
+    GroupAuthor.objects.bulk_create(
+        [GroupAuthor(group_id=row['group_id'], author_id=row['author_id'],
+                     last_post_date=row['last'])
+         for row in Post.objects.filter(group__isnull=False).order_by(
+            ).values('group_id', 'author_id').annotate(
+            last=Max('pub_date')).iterator()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0018_hot_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.Group', verbose_name='Группа')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+                ('last_post_date', models.DateTimeField(blank=True, null=True, verbose_name='Последний пост')),
+            ],
+            options={
+                'verbose_name_plural': 'Счетчики групп',
+            },
+        ),
+        migrations.CreateModel(
+            name='GroupAuthor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_post_date', models.DateTimeField(verbose_name='Последний пост')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='authors', to='posts.Group', verbose_name='Группа')),
+            ],
+            options={
+                'verbose_name_plural': 'Авторы групп',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='groupauthor',
+            constraint=models.UniqueConstraint(fields=('group', 'author'), name='unique_group_author'),
+        ),
+        migrations.RunPython(fill_group_stats, migrations.RunPython.noop),
+    ]
@@ -37,6 +37,16 @@ class Post(BaseModel):
         blank=True,
         upload_to='posts/'
     )
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Комментариев',
+        default=0,
+        editable=False
+    )
+    hot_score = models.FloatField(
+        verbose_name='Рейтинг',
+        default=0,
+        editable=False
+    )
 
     def __str__(self):
         return self.text[:15]
@@ -44,6 +54,19 @@ class Post(BaseModel):
     class Meta:
         ordering = ('-pub_date',)
         verbose_name_plural = "Посты"
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_pub_date_idx'),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'),
+            models.Index(
+                fields=['-hot_score', '-id'], name='post_hot_score_idx',
+                condition=models.Q(hot_score__gt=0)),
+        ]
 
 
 class Comment(BaseModel):
@@ -61,6 +84,11 @@ class Comment(BaseModel):
     class Meta:
         ordering = ('-pub_date',)
         verbose_name_plural = "Комментарии"
+        indexes = [
+            models.Index(
+                fields=['post', '-pub_date', '-id'],
+                name='comment_post_pub_date_idx'),
+        ]
 
 
 class Follow(models.Model):
@@ -77,5 +105,97 @@ class Follow(models.Model):
 
     class Meta:
         verbose_name_plural = "Подписки"
-        constraints = models.UniqueConstraint(
-            fields=['user', 'author'], name='unique_combination')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_combination'),
+        ]
+
+
+class FeedEntry(models.Model):
+    '''Запись материализованной ленты подписок пользователя.'''
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Читатель')
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Пост')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор')
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        verbose_name_plural = "Ленты подписок"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_feed_entry'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='feed_user_pub_date_idx'),
+        ]
+
+
+class UserStats(models.Model):
+    '''Денормализованные счетчики пользователя.'''
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь')
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Подписчиков', default=0)
+    following_count = models.PositiveIntegerField(
+        verbose_name='Подписок', default=0)
+
+    class Meta:
+        verbose_name_plural = "Счетчики пользователей"
+
+
+class GroupStats(models.Model):
+    '''Денормализованные счетчики группы.'''
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Группа')
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Постов', default=0)
+    last_post_date = models.DateTimeField(
+        verbose_name='Последний пост', null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "Счетчики групп"
+
+
+class GroupAuthor(models.Model):
+    '''Последний пост автора в группе, по нему считаются активные авторы.'''
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='authors',
+        verbose_name='Группа')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор')
+    last_post_date = models.DateTimeField(verbose_name='Последний пост')
+
+    class Meta:
+        verbose_name_plural = "Авторы групп"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['group', 'author'], name='unique_group_author'),
+        ]
@@ -0,0 +1,120 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class CursorPaginator(Paginator):
+    '''Постраничный вывод по ключу сортировки (keyset).
+
+    Вместо COUNT(*) и LIMIT/OFFSET страница выбирается условием
+    «после последней записи предыдущей страницы», поэтому стоимость
+    любой страницы одинакова. Номер страницы и число страниц
+    условные: они нужны только для совместимости с шаблоном
+    paginator.html.
+    '''
+
+    keyset = True
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id')):
+        super().__init__(object_list.order_by(*ordering), per_page)
+        self.ordering = tuple(ordering)
+        self.fields = tuple(field.lstrip('-') for field in self.ordering)
+        self.next_cursor = None
+        self.previous_cursor = None
+        self._count = 0
+        self._num_pages = 1
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def num_pages(self):
+        return self._num_pages
+
+    def get_page(self, cursor=None):
+        '''Возвращает страницу по непрозрачному токену cursor.
+
+        Некорректный токен, как и номер страницы в Paginator.get_page,
+        не приводит к ошибке: отдаётся первая страница.
+        '''
+        direction, values = self.decode(cursor)
+        backwards = direction == PREVIOUS
+        rows = list(self.page_queryset(direction, values))
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            has_previous, has_next = has_more, True
+        else:
+            has_previous, has_next = values is not None, has_more
+        if rows and has_previous:
+            self.previous_cursor = self.encode(PREVIOUS, rows[0])
+        if rows and has_next:
+            self.next_cursor = self.encode(NEXT, rows[-1])
+        number = 2 if self.previous_cursor else 1
+        self._num_pages = number + 1 if self.next_cursor else number
+        self._count = (number - 1) * self.per_page + len(rows)
+        return Page(rows, number, self)
+
+    def page_queryset(self, direction=NEXT, values=None):
+        '''Запрос страницы с одной лишней строкой для has_next.'''
+        backwards = direction == PREVIOUS
+        queryset = self.object_list
+        if values is not None:
+            queryset = queryset.filter(self._after(values, backwards))
+        ordering = self.ordering
+        if backwards:
+            ordering = tuple(self._flip(field) for field in ordering)
+        return queryset.order_by(*ordering)[:self.per_page + 1]
+
+    def encode(self, direction, row):
+        values = []
+        for field in self.fields:
+            value = row[field] if isinstance(row, dict) else getattr(
+                row, field)
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            values.append(value)
+        raw = json.dumps([direction, values]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode(self, cursor):
+        if not cursor:
+            return NEXT, None
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            direction, values = json.loads(raw.decode())
+            if direction not in (NEXT, PREVIOUS):
+                raise ValueError(direction)
+            if len(values) != len(self.fields):
+                raise ValueError(values)
+            opts = self.object_list.model._meta
+            values = [opts.get_field(field).to_python(value)
+                      for field, value in zip(self.fields, values)]
+        except (binascii.Error, FieldDoesNotExist, TypeError, ValueError,
+                ValidationError):
+            return NEXT, None
+        return direction, values
+
+    def _after(self, values, backwards):
+        '''Условие «строго после values» в порядке сортировки.'''
+        condition = Q()
+        for position, field in enumerate(self.ordering):
+            descending = field.startswith('-') != backwards
+            lookup = '__lt' if descending else '__gt'
+            step = Q(**dict(zip(self.fields[:position], values[:position])))
+            step &= Q(**{self.fields[position] + lookup: values[position]})
+            condition |= step
+        return condition
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else '-' + field
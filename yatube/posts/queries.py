@@ -0,0 +1,36 @@
+from .models import Comment, FeedEntry, Post
+
+POST_ORDERING = ('-pub_date', '-id')
+FEED_ORDERING = ('-pub_date', '-post_id')
+COMMENT_ORDERING = ('-pub_date', '-id')
+HOT_ORDERING = ('-hot_score', '-id')
+
+
+def index_feed():
+    return Post.objects.select_related('group', 'author')
+
+
+def hot_feed():
+    return Post.objects.select_related('group', 'author').filter(
+        hot_score__gt=0)
+
+
+def group_feed(group_id):
+    return Post.objects.select_related('group', 'author').filter(
+        group_id=group_id)
+
+
+def author_feed(author_id):
+    return Post.objects.select_related('author', 'group').filter(
+        author_id=author_id)
+
+
+def follow_feed(user_id):
+    return FeedEntry.objects.select_related(
+        'post__author', 'post__group').filter(user_id=user_id)
+
+
+def post_comments(post_id):
+    return Comment.objects.select_related('author').only(
+        'id', 'pub_date', 'text', 'author', 'author__username').filter(
+        post_id=post_id)
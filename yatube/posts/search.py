@@ -0,0 +1,211 @@
+import base64
+import binascii
+import json
+from collections import namedtuple
+from itertools import islice
+
+from django.db import connection, transaction
+
+from .models import Comment, Post
+from .stemmer import stems
+
+TABLE = 'posts_search'
+
+SearchResult = namedtuple('SearchResult', 'post comment')
+
+
+def doc_id(obj):
+    '''rowid документа: посты четные, комментарии нечетные.'''
+    return obj.pk * 2 + isinstance(obj, Comment)
+
+
+class SqliteIndex:
+    '''FTS5 с заранее выделенными основами слов.'''
+
+    def create(self, cursor):
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5('
+            f'body, post_id UNINDEXED, '
+            f"tokenize = 'unicode61 remove_diacritics 0')")
+
+    def drop(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+    def clear(self, cursor):
+        cursor.execute(f'DELETE FROM {TABLE}')
+
+    def save(self, cursor, rowid, post_id, text):
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [rowid])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, body, post_id) VALUES (%s, %s, %s)',
+            [rowid, ' '.join(stems(text)), post_id])
+
+    def fill(self, cursor, documents):
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, body, post_id) VALUES (%s, %s, %s)',
+            [(rowid, ' '.join(stems(text)), post_id)
+             for rowid, post_id, text in documents])
+
+    def search(self, cursor, query, after, limit):
+        terms = ' '.join(f'"{term}"' for term in stems(query))
+        if not terms:
+            return []
+        sql = (f'SELECT rowid, post_id, bm25({TABLE}) FROM {TABLE} '
+               f'WHERE {TABLE} MATCH %s')
+        params = [terms]
+        if after:
+            sql += (f' AND (bm25({TABLE}) > %s OR '
+                    f'(bm25({TABLE}) = %s AND rowid > %s))')
+            params += [after[0], after[0], after[1]]
+        sql += f' ORDER BY bm25({TABLE}), rowid LIMIT %s'
+        cursor.execute(sql, params + [limit])
+        return cursor.fetchall()
+
+
+class PostgresIndex:
+    '''tsvector со словарем russian и GIN-индексом.'''
+
+    def create(self, cursor):
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {TABLE} ('
+            f'rowid bigint PRIMARY KEY, post_id integer NOT NULL, '
+            f'document tsvector NOT NULL)')
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {TABLE}_document_idx '
+            f'ON {TABLE} USING GIN (document)')
+
+    def drop(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+    def clear(self, cursor):
+        cursor.execute(f'TRUNCATE {TABLE}')
+
+    def save(self, cursor, rowid, post_id, text):
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, post_id, document) '
+            f"VALUES (%s, %s, to_tsvector('russian', %s)) "
+            f'ON CONFLICT (rowid) DO UPDATE SET document = EXCLUDED.document',
+            [rowid, post_id, text])
+
+    def fill(self, cursor, documents):
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, post_id, document) '
+            f"VALUES (%s, %s, to_tsvector('russian', %s))",
+            [(rowid, post_id, text) for rowid, post_id, text in documents])
+
+    def search(self, cursor, query, after, limit):
+        sql = (f'SELECT * FROM (SELECT rowid, post_id, '
+               f'-ts_rank_cd(document, query) AS score '
+               f"FROM {TABLE}, plainto_tsquery('russian', %s) query "
+               f'WHERE document @@ query) hits')
+        params = [query]
+        if after:
+            sql += ' WHERE score > %s OR (score = %s AND rowid > %s)'
+            params += [after[0], after[0], after[1]]
+        sql += ' ORDER BY score, rowid LIMIT %s'
+        cursor.execute(sql, params + [limit])
+        return cursor.fetchall()
+
+
+INDEXES = {
+    'sqlite': SqliteIndex(),
+    'postgresql': PostgresIndex(),
+}
+
+
+def get_index(vendor=None):
+    return INDEXES.get(vendor or connection.vendor)
+
+
+def index(obj):
+    backend = get_index()
+    if backend is None:
+        return
+    post_id = obj.post_id if isinstance(obj, Comment) else obj.pk
+    with connection.cursor() as cursor:
+        backend.save(cursor, doc_id(obj), post_id, obj.text)
+
+
+def remove(obj):
+    if get_index() is None:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {TABLE} WHERE rowid = %s', [doc_id(obj)])
+
+
+def documents(batch_size):
+    '''(rowid, post_id, text) всех постов и комментариев.'''
+    for model, post_field in ((Post, 'id'), (Comment, 'post_id')):
+        rows = model.objects.order_by().values_list('id', post_field, 'text')
+        for pk, post_id, text in rows.iterator(chunk_size=batch_size):
+            yield pk * 2 + (model is Comment), post_id, text
+
+
+def rebuild(batch_size=1000):
+    '''Заново наполняет индекс всеми постами и комментариями.
+
+    Документы вставляются пачками executemany, каждая пачка в своей
+    транзакции.
+    '''
+    backend = get_index()
+    if backend is None:
+        return 0
+    total = 0
+    rows = documents(batch_size)
+    with connection.cursor() as cursor:
+        backend.create(cursor)
+        backend.clear(cursor)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            with transaction.atomic():
+                backend.fill(cursor, batch)
+            total += len(batch)
+    return total
+
+
+def encode_cursor(score, rowid):
+    raw = json.dumps([score, rowid]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        score, rowid = json.loads(raw.decode())
+        return float(score), int(rowid)
+    except (binascii.Error, TypeError, ValueError):
+        return None
+
+
+def search(query, cursor=None, limit=10):
+    '''Страница результатов и курсор следующей страницы.
+
+    Результаты упорядочены по релевантности, страницы листаются
+    по ключу (релевантность, rowid).
+    '''
+    backend = get_index()
+    if backend is None:
+        return [], None
+    with connection.cursor() as db_cursor:
+        hits = backend.search(
+            db_cursor, query, decode_cursor(cursor), limit + 1)
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        next_cursor = encode_cursor(hits[-1][2], hits[-1][0])
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        {post_id for _, post_id, _ in hits})
+    comments = Comment.objects.select_related('author').in_bulk(
+        [rowid // 2 for rowid, _, _ in hits if rowid % 2])
+    results = []
+    for rowid, post_id, _ in hits:
+        post = posts.get(post_id)
+        comment = comments.get(rowid // 2) if rowid % 2 else None
+        if post is not None and (comment is not None or not rowid % 2):
+            results.append(SearchResult(post, comment))
+    return results, next_cursor
@@ -0,0 +1,153 @@
+from django.core.cache import cache
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import cards, counters, feed, follows, groups, hot, search
+from .models import (Comment, Follow, Group, GroupStats, Post, User,
+                     UserStats)
+
+
+# Поля пользователя, которые выводятся в карточках и лентах.
+USER_CARD_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def _card_fields(user):
+    return {field: user.__dict__.get(field) for field in USER_CARD_FIELDS}
+
+
+@receiver(post_init, sender=User)
+def user_loaded(sender, instance, **kwargs):
+    instance._initial_card_fields = _card_fields(instance)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, update_fields=None,
+               **kwargs):
+    initial = instance._initial_card_fields
+    instance._initial_card_fields = _card_fields(instance)
+    if created:
+        if not raw:
+            UserStats.objects.get_or_create(user=instance)
+            cache.delete(cards.id_key(User, 'username', instance.username))
+        return
+    # Вход и смена пароля не меняют того, что видно в лентах.
+    if update_fields is not None and not set(update_fields) & set(
+            USER_CARD_FIELDS):
+        return
+    if initial == instance._initial_card_fields:
+        return
+    if initial['username'] != instance.username:
+        cache.delete(cards.id_key(User, 'username', initial['username']))
+    cards.bump('user', instance.pk)
+    cards.bump_feeds('all')
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    cards.bump('user', instance.pk)
+    cards.bump_feeds('all')
+    cache.delete(cards.id_key(User, 'username', instance.username))
+
+
+@receiver(post_init, sender=Group)
+def group_loaded(sender, instance, **kwargs):
+    instance._initial_slug = instance.__dict__.get('slug')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, created=False, **kwargs):
+    cards.bump('group', instance.pk)
+    cards.bump_feeds('all')
+    groups.changed()
+    if created:
+        GroupStats.objects.get_or_create(group=instance)
+    # Старый slug больше не ведет к группе, новый мог быть закэширован
+    # как отсутствующий.
+    cache.delete_many([cards.id_key(Group, 'slug', slug) for slug in
+                       {instance._initial_slug, instance.slug} if slug])
+    instance._initial_slug = instance.slug
+
+
+@receiver(post_init, sender=Post)
+def post_loaded(sender, instance, **kwargs):
+    # Группа до правки: пост нужно убрать и из ее ленты.
+    instance._initial_group_id = instance.__dict__.get('group_id')
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, raw=False, **kwargs):
+    if instance._state.adding and not raw:
+        instance.hot_score = hot.initial(instance)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    cards.bump('post', instance.pk)
+    cards.bump_feeds(f'group:{instance._initial_group_id}',
+                     *cards.feed_scopes(instance))
+    old_group_id = None if created else instance._initial_group_id
+    instance._initial_group_id = instance.group_id
+    search.index(instance)
+    if raw:
+        return
+    if created:
+        counters.change_user(instance.author_id, posts_count=1)
+        feed.fan_out(instance)
+    if old_group_id != instance.group_id:
+        if old_group_id:
+            counters.change_group(old_group_id, -1)
+            counters.group_author_left(old_group_id, instance.author_id)
+        if instance.group_id:
+            counters.change_group(instance.group_id, 1)
+            counters.group_author_posted(
+                instance.group_id, instance.author_id, instance.pub_date)
+        groups.changed()
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    cards.bump('post', instance.pk)
+    cards.bump_feeds(*cards.feed_scopes(instance))
+    search.remove(instance)
+    counters.change_user(instance.author_id, posts_count=-1)
+    if instance.group_id:
+        counters.change_group(instance.group_id, -1)
+        counters.group_author_left(instance.group_id, instance.author_id)
+        groups.changed()
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    cards.bump('post', instance.post_id)
+    search.index(instance)
+    if created and not raw:
+        counters.change_post(instance.post_id, 1)
+        hot.comment_added(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    cards.bump('post', instance.post_id)
+    search.remove(instance)
+    counters.change_post(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_user(instance.author_id, followers_count=1)
+        counters.change_user(instance.user_id, following_count=1)
+        follows.changed(instance.user_id, instance.author_id)
+        feed.backfill(instance.user_id, instance.author_id)
+        cards.bump_feeds(f'user:{instance.author_id}')
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change_user(instance.author_id, followers_count=-1)
+    counters.change_user(instance.user_id, following_count=-1)
+    follows.changed(instance.user_id, instance.author_id)
+    feed.drop(instance.user_id, instance.author_id)
+    cards.bump_feeds(f'user:{instance.author_id}')
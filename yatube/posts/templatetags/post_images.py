@@ -0,0 +1,17 @@
+from django import template
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/post_image.html')
+def post_image(image, size):
+    '''Картинка поста с srcset или заглушка, пока миниатюр нет.'''
+    width, height = thumbnails.SIZES[size]['ratio']
+    return {
+        'image': image,
+        'attrs': thumbnails.ready(image, size),
+        'sizes': thumbnails.SIZES[size]['sizes'],
+        'width': width,
+        'height': height,
+    }
@@ -0,0 +1,134 @@
+import json
+
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='api', description='Описание')
+        cls.posts = [Post.objects.create(
+            author=cls.author, text=f'Пост {number}', group=cls.group)
+            for number in range(5)]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.user, text='Комментарий')
+
+    def get(self, url, client=None, **params):
+        response = (client or self.client).get(url, params)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        content = (b''.join(response.streaming_content)
+                   if response.streaming else response.content)
+        return response, json.loads(content)
+
+    def test_feeds(self):
+        '''Ленты отдают посты в том же порядке, что и страницы'''
+        urls = [reverse('posts:api_index'),
+                reverse('posts:api_group', kwargs={'slug': 'api'}),
+                reverse('posts:api_profile', kwargs={'username': 'writer'})]
+        ids = [post.id for post in reversed(ApiTest.posts)]
+        for url in urls:
+            with self.subTest(url=url):
+                response, data = self.get(url)
+                self.assertTrue(response.streaming)
+                self.assertEqual(
+                    [item['id'] for item in data['results']], ids)
+                self.assertEqual(data['results'][0]['author'], 'writer')
+                self.assertEqual(data['results'][0]['group'], 'api')
+                self.assertIsNone(data['next'])
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_rows_read_before_response(self):
+        '''Строки ленты читаются до ответа и попадают в бюджет'''
+        response, data = self.get(reverse('posts:api_index'))
+        self.assertEqual(len(data['results']), len(ApiTest.posts))
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+
+    def test_cursor_and_fields(self):
+        '''Курсор листает страницы, fields ограничивает поля'''
+        url = reverse('posts:api_index')
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 2, 'fields': 'id'}
+            if cursor:
+                params['cursor'] = cursor
+            data = self.get(url, **params)[1]
+            for item in data['results']:
+                self.assertEqual(list(item), ['id'])
+            seen += [item['id'] for item in data['results']]
+            cursor = data['next']
+            if not cursor:
+                break
+        self.assertEqual(seen, [post.id for post in reversed(ApiTest.posts)])
+
+    def test_bad_params(self):
+        '''Неизвестное поле и неверный limit дают 400'''
+        url = reverse('posts:api_index')
+        for params in ({'fields': 'id,password'}, {'limit': 0},
+                       {'limit': 'x'}):
+            with self.subTest(params=params):
+                response, data = self.get(url, **params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', data)
+
+    def test_missing(self):
+        '''Несуществующие группа, автор и пост дают 404'''
+        for url in (reverse('posts:api_group', kwargs={'slug': 'missing'}),
+                    reverse('posts:api_profile',
+                            kwargs={'username': 'missing'}),
+                    reverse('posts:api_post', kwargs={'post_id': 999})):
+            with self.subTest(url=url):
+                self.assertEqual(self.get(url)[0].status_code, 404)
+
+    def test_group_slug_changes(self):
+        '''После смены slug группа доступна только по новому'''
+        group = Group.objects.create(
+            title='Переименуемая', slug='before', description='Описание')
+        Post.objects.create(author=ApiTest.author, text='Пост', group=group)
+        self.assertEqual(self.get(reverse(
+            'posts:api_group', kwargs={'slug': 'before'}))[0].status_code,
+            200)
+        self.assertEqual(self.get(reverse(
+            'posts:api_group', kwargs={'slug': 'after'}))[0].status_code,
+            404)
+        group.slug = 'after'
+        group.save()
+        for slug, status in (('before', 404), ('after', 200)):
+            with self.subTest(slug=slug):
+                response = self.get(reverse(
+                    'posts:api_group', kwargs={'slug': slug}))[0]
+                self.assertEqual(response.status_code, status)
+        group.delete()
+        self.assertEqual(self.get(reverse(
+            'posts:api_group', kwargs={'slug': 'after'}))[0].status_code,
+            404)
+
+    def test_post_detail(self):
+        '''Пост отдается вместе с первой страницей комментариев'''
+        post = ApiTest.posts[0]
+        data = self.get(reverse('posts:api_post', kwargs={
+            'post_id': post.id}), fields='text,comments_count')[1]
+        self.assertEqual(data['text'], post.text)
+        self.assertEqual(data['comments_count'], 1)
+        self.assertEqual(data['comments'][0]['text'], 'Комментарий')
+        self.assertIsNone(data['comments_next'])
+        data = self.get(reverse('posts:api_comments', kwargs={
+            'post_id': post.id}))[1]
+        self.assertEqual(data['results'][0]['author'], 'reader')
+
+    def test_follow_feed(self):
+        '''Лента подписок только для вошедших пользователей'''
+        url = reverse('posts:api_follow_index')
+        self.assertEqual(self.get(url, Client())[0].status_code, 401)
+        Follow.objects.create(user=ApiTest.user, author=ApiTest.author)
+        self.client.force_login(ApiTest.user)
+        data = self.get(url, fields='id,author')[1]
+        self.assertEqual([item['id'] for item in data['results']],
+                         [post.id for post in reversed(ApiTest.posts)])
+        self.assertEqual(data['results'][0]['author'], 'writer')
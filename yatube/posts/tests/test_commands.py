@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from posts import benchmark, transfer
+from posts.management.commands.check_feed_indexes import bad_plan
+from posts.models import (Comment, FeedEntry, Follow, Group, Post, User,
+                          UserStats)
+
+
+class CheckFeedIndexesTest(TestCase):
+    def test_feed_queries_use_indexes(self):
+        '''Запросы лент используют индексы'''
+        out = StringIO()
+        call_command('check_feed_indexes', stdout=out)
+        self.assertNotIn('полное сканирование', out.getvalue())
+
+    def test_full_scan_detected(self):
+        '''Полное сканирование с сортировкой распознается'''
+        plan = ('2 0 0 SCAN posts_post\n'
+                '20 0 0 USE TEMP B-TREE FOR ORDER BY')
+        self.assertTrue(bad_plan(plan, 'sqlite'))
+        self.assertFalse(bad_plan(
+            '7 0 0 SCAN posts_post USING INDEX post_pub_date_idx',
+            'sqlite'))
+
+
+class BenchmarkTest(TestCase):
+    def test_seed_and_run(self):
+        '''Прогон наполняет базу и измеряет все view'''
+        benchmark.seed({'users': 5, 'groups': 2, 'posts': 20,
+                        'follows': 5, 'comments': 10})
+        self.assertEqual(Post.objects.count(), 20)
+        self.assertTrue(FeedEntry.objects.exists())
+        self.assertEqual(UserStats.objects.count(), 5)
+        results = benchmark.run(requests=2, warmup=0)
+        self.assertEqual(len(results), 8)
+        for name, result in results.items():
+            with self.subTest(name=name):
+                self.assertIn(result['status'], (200, 302))
+                self.assertGreater(result['queries'], 0)
+        changes = benchmark.compare(results, results)
+        self.assertEqual(changes['index']['queries'], 0)
+
+
+class TransferTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        group = Group.objects.create(
+            title='Группа', slug='transfer', description='Описание')
+        self.post = Post.objects.create(
+            author=TransferTest.author, group=group, text='Пост')
+        Post.objects.filter(pk=self.post.pk).update(
+            pub_date=self.post.pub_date - timedelta(days=3))
+        Comment.objects.create(
+            post=self.post, author=TransferTest.reader, text='Комментарий')
+        Follow.objects.create(
+            user=TransferTest.reader, author=TransferTest.author)
+
+    def round_trip(self, fmt):
+        models = ('group', 'post', 'comment', 'follow')
+        paths = {}
+        for name in models:
+            paths[name] = os.path.join(
+                TransferTest.directory, f'{name}.{fmt}')
+            call_command('export_data', name, format=fmt,
+                         output=paths[name], stdout=StringIO(),
+                         stderr=StringIO())
+        pub_date = Post.objects.get(pk=self.post.pk).pub_date
+        Group.objects.all().delete()
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+        for name in models:
+            call_command('import_data', name, paths[name],
+                         rebuild=name == models[-1],
+                         stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(Post.objects.get(pk=self.post.pk).pub_date, pub_date)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertTrue(FeedEntry.objects.filter(
+            user=TransferTest.reader, post=self.post).exists())
+        stats = UserStats.objects.get(user=TransferTest.author)
+        self.assertEqual(
+            (stats.posts_count, stats.followers_count), (1, 1))
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).comments_count, 1)
+
+    def test_jsonl_round_trip(self):
+        '''Выгрузка и загрузка JSON Lines сохраняют данные'''
+        self.round_trip('jsonl')
+
+    def test_csv_round_trip(self):
+        '''Выгрузка и загрузка CSV сохраняют данные'''
+        self.round_trip('csv')
+
+    def test_resume(self):
+        '''Загрузка продолжается с сохраненной точки'''
+        rows = [{'id': 900 + number, 'title': f'Группа {number}',
+                 'slug': f'resume{number}', 'description': ''}
+                for number in range(5)]
+        checkpoints = []
+        transfer.import_rows('group', iter(rows), batch_size=2,
+                             on_batch=checkpoints.append)
+        self.assertEqual(checkpoints, [2, 4, 5])
+        Group.objects.filter(pk__gte=903).delete()
+        transfer.import_rows('group', iter(rows), batch_size=2, skip=4)
+        self.assertFalse(Group.objects.filter(pk=903).exists())
+        self.assertTrue(Group.objects.filter(pk=904).exists())
@@ -0,0 +1,144 @@
+from core.middleware import PIN_COOKIE
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts import feed, follows
+from posts.models import FeedEntry, Follow, Post, User
+
+
+class FeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.old_post = Post.objects.create(
+            author=cls.author,
+            text='Пост до подписки')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(FeedTest.user)
+
+    def test_follow_backfills_feed(self):
+        '''Подписка добавляет в ленту уже опубликованные посты'''
+        Follow.objects.create(user=FeedTest.user, author=FeedTest.author)
+        self.assertTrue(FeedEntry.objects.filter(
+            user=FeedTest.user, post=FeedTest.old_post).exists())
+
+    def test_new_post_fans_out(self):
+        '''Новый пост попадает в ленты подписчиков'''
+        Follow.objects.create(user=FeedTest.user, author=FeedTest.author)
+        post = Post.objects.create(author=FeedTest.author, text='Новый')
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0], post)
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+    def test_unfollow_clears_feed(self):
+        '''Отписка удаляет посты автора из ленты'''
+        follow = Follow.objects.create(
+            user=FeedTest.user, author=FeedTest.author)
+        follow.delete()
+        self.assertFalse(
+            FeedEntry.objects.filter(user=FeedTest.user).exists())
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_popular_author_pulled_on_read(self):
+        '''Посты популярного автора подтягиваются при чтении ленты'''
+        Follow.objects.create(user=FeedTest.user, author=FeedTest.author)
+        self.authorized_client.get(reverse('posts:follow_index'))
+        post = Post.objects.create(author=FeedTest.author, text='Новый')
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0], post)
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_pull_resumes_from_feed(self):
+        '''pull отсчитывает новые посты от записей ленты, а не от кэша'''
+        Follow.objects.create(user=FeedTest.user, author=FeedTest.author)
+        feed.pull(FeedTest.user.id)
+        late = Post.objects.create(author=FeedTest.author, text='Поздний')
+        Post.objects.filter(pk=late.pk).update(
+            pub_date=FeedTest.old_post.pub_date)
+        cache.clear()
+        feed.pull(FeedTest.user.id)
+        self.assertTrue(FeedEntry.objects.filter(
+            user=FeedTest.user, post=late).exists())
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_pull_without_new_posts_reads_only(self):
+        '''Повторное чтение ленты без новых постов ничего не пишет'''
+        Follow.objects.create(user=FeedTest.user, author=FeedTest.author)
+        url = reverse('posts:follow_index')
+        self.authorized_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(url)
+        self.assertFalse([query for query in queries.captured_queries
+                          if query['sql'].startswith('INSERT')])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    @override_settings(FEED_BACKFILL_LIMIT=2)
+    def test_rebuild_keeps_latest_posts(self):
+        '''Пересборка кладет в ленту последние посты каждого автора'''
+        Follow.objects.create(user=FeedTest.user, author=FeedTest.author)
+        for number in range(3):
+            Post.objects.create(author=FeedTest.author, text=f'Пост {number}')
+        FeedEntry.objects.all().delete()
+        feed.rebuild()
+        latest = Post.objects.filter(author=FeedTest.author).order_by(
+            '-pub_date', '-id').values_list('id', flat=True)[:2]
+        self.assertEqual(
+            set(FeedEntry.objects.filter(
+                user=FeedTest.user).values_list('post_id', flat=True)),
+            set(latest))
+
+
+class FollowGraphTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.authors = [User.objects.create_user(username=f'writer{number}')
+                       for number in range(3)]
+
+    def setUp(self):
+        cache.clear()
+        Follow.objects.create(
+            user=FollowGraphTest.user, author=FollowGraphTest.authors[0])
+
+    def test_batch_checks_cached(self):
+        '''Проверки подписок после первой не обращаются к БД'''
+        user = FollowGraphTest.user
+        ids = [author.id for author in FollowGraphTest.authors]
+        self.assertEqual(follows.followed_among(user.id, ids), {ids[0]})
+        with self.assertNumQueries(0):
+            self.assertTrue(follows.is_following(user.id, ids[0]))
+            self.assertFalse(follows.is_following(user.id, ids[1]))
+
+    def test_follow_updates_graph(self):
+        '''Подписка и отписка сразу видны в графе и счетчиках'''
+        user, author = FollowGraphTest.user, FollowGraphTest.authors[1]
+        self.assertFalse(follows.is_following(user.id, author.id))
+        self.assertEqual(follows.follower_counts([author.id]), {author.id: 0})
+        follow = Follow.objects.create(user=user, author=author)
+        self.assertTrue(follows.is_following(user.id, author.id))
+        self.assertEqual(follows.follower_counts([author.id]), {author.id: 1})
+        follow.delete()
+        self.assertFalse(follows.is_following(user.id, author.id))
+        self.assertEqual(follows.follower_counts([author.id]), {author.id: 0})
+
+    def test_follow_idempotent(self):
+        '''Повторная подписка и отписка ничего не меняют'''
+        user, author = FollowGraphTest.user, FollowGraphTest.authors[2]
+        self.assertTrue(follows.follow(user.id, author.id))
+        self.assertFalse(follows.follow(user.id, author.id))
+        self.assertFalse(follows.follow(user.id, user.id))
+        self.assertEqual(Follow.objects.filter(
+            user=user, author=author).count(), 1)
+        self.assertEqual(follows.follower_counts([author.id]), {author.id: 1})
+        self.assertTrue(follows.unfollow(user.id, author.id))
+        self.assertFalse(follows.unfollow(user.id, author.id))
+        self.assertFalse(follows.is_following(user.id, author.id))
+        self.assertEqual(follows.follower_counts([author.id]), {author.id: 0})
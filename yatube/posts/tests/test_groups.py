@@ -0,0 +1,112 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from posts import counters, groups
+from posts.models import Group, GroupAuthor, GroupStats, Post, User
+
+
+class GroupDirectoryTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Альфа', slug='alpha', description='Описание')
+        cls.empty = Group.objects.create(
+            title='Бета', slug='beta', description='Описание')
+
+    def setUp(self):
+        cache.clear()
+
+    def entry(self, slug):
+        return next(group for group in groups.directory()
+                    if group['slug'] == slug)
+
+    def test_counters_follow_posts(self):
+        '''Счетчики группы меняются при создании, переносе и удалении'''
+        first = Post.objects.create(
+            author=GroupDirectoryTest.user, text='Первый',
+            group=GroupDirectoryTest.group)
+        second = Post.objects.create(
+            author=GroupDirectoryTest.other, text='Второй',
+            group=GroupDirectoryTest.group)
+        entry = self.entry('alpha')
+        self.assertEqual(entry['posts_count'], 2)
+        self.assertEqual(entry['active_authors'], 2)
+        self.assertEqual(entry['last_post_date'], second.pub_date)
+        second.group = GroupDirectoryTest.empty
+        second.save()
+        entry = self.entry('alpha')
+        self.assertEqual(entry['posts_count'], 1)
+        self.assertEqual(entry['active_authors'], 1)
+        self.assertEqual(entry['last_post_date'], first.pub_date)
+        self.assertEqual(self.entry('beta')['posts_count'], 1)
+        self.assertEqual(self.entry('beta')['active_authors'], 1)
+        first.delete()
+        entry = self.entry('alpha')
+        self.assertEqual(entry['posts_count'], 0)
+        self.assertEqual(entry['active_authors'], 0)
+        self.assertIsNone(entry['last_post_date'])
+
+    def test_post_of_deleted_group(self):
+        '''Пост, загруженный до удаления группы, удаляется без ошибок'''
+        group = Group.objects.create(
+            title='Временная', slug='temporary', description='Описание')
+        post = Post.objects.create(
+            author=GroupDirectoryTest.user, text='Пост', group=group)
+        group_id = group.pk
+        group.delete()
+        post.delete()
+        self.assertFalse(
+            GroupStats.objects.filter(group_id=group_id).exists())
+
+    def test_author_date_refreshed(self):
+        '''После удаления поста дата автора берется из оставшихся'''
+        old = Post.objects.create(
+            author=GroupDirectoryTest.user, text='Старый',
+            group=GroupDirectoryTest.group)
+        Post.objects.filter(pk=old.pk).update(
+            pub_date=timezone.now() - timedelta(days=365))
+        old.refresh_from_db()
+        Post.objects.create(
+            author=GroupDirectoryTest.user, text='Новый',
+            group=GroupDirectoryTest.group).delete()
+        self.assertEqual(GroupAuthor.objects.get(
+            group=GroupDirectoryTest.group).last_post_date, old.pub_date)
+        self.assertEqual(self.entry('alpha')['active_authors'], 0)
+
+    def test_active_window(self):
+        '''Авторы без постов за окно не считаются активными'''
+        Post.objects.create(author=GroupDirectoryTest.user, text='Пост',
+                            group=GroupDirectoryTest.group)
+        GroupAuthor.objects.update(
+            last_post_date=timezone.now() - timedelta(days=365))
+        self.assertEqual(self.entry('alpha')['active_authors'], 0)
+
+    def test_page_from_cache(self):
+        '''Каталог строится одним запросом и дальше читается из кэша'''
+        client = Client()
+        url = reverse('posts:group_index')
+        with self.assertNumQueries(1):
+            response = client.get(url)
+        self.assertEqual([group['slug'] for group in
+                          response.context['page_obj']], ['alpha', 'beta'])
+        with self.assertNumQueries(0):
+            client.get(url)
+        Group.objects.create(title='Гамма', slug='gamma', description='-')
+        self.assertEqual(len(client.get(url).context['page_obj']), 3)
+
+    def test_reconcile(self):
+        '''reconcile восстанавливает счетчики групп'''
+        Post.objects.create(author=GroupDirectoryTest.user, text='Пост',
+                            group=GroupDirectoryTest.group)
+        GroupStats.objects.all().delete()
+        GroupAuthor.objects.all().delete()
+        counters.reconcile()
+        stats = GroupStats.objects.get(group=GroupDirectoryTest.group)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(GroupAuthor.objects.count(), 1)
@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from posts import hot
+from posts.models import Comment, Post, User
+
+
+class HotTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.quiet = Post.objects.create(author=cls.user, text='Тихий пост')
+        cls.busy = Post.objects.create(author=cls.user, text='Обсуждаемый')
+        cls.old = Post.objects.create(author=cls.user, text='Старый пост')
+        Post.objects.filter(pk=cls.old.pk).update(
+            pub_date=timezone.now() - timedelta(days=30))
+
+    def test_comment_raises_score(self):
+        '''Новый комментарий сразу поднимает пост в ленте'''
+        busy = HotTest.busy
+        before = Post.objects.get(pk=busy.pk).hot_score
+        self.assertGreater(before, 0)
+        Comment.objects.create(post=busy, author=HotTest.user, text='Да')
+        self.assertGreater(Post.objects.get(pk=busy.pk).hot_score, before)
+        response = Client().get(reverse('posts:hot'))
+        self.assertEqual(response.context['page_obj'][0], busy)
+
+    def test_recompute(self):
+        '''Пересчет учитывает комментарии и убирает старые посты'''
+        Comment.objects.create(
+            post=HotTest.quiet, author=HotTest.user, text='Да')
+        Post.objects.update(hot_score=1)
+        self.assertEqual(hot.recompute(batch_size=1), 2)
+        response = Client().get(reverse('posts:hot'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [HotTest.quiet, HotTest.busy])
+        self.assertEqual(Post.objects.get(pk=HotTest.old.pk).hot_score, 0)
+
+    def test_decay(self):
+        '''Рейтинг падает с возрастом и обнуляется за окном'''
+        now = timezone.now()
+        self.assertGreater(hot.decay(now, now),
+                           hot.decay(now - timedelta(hours=5), now))
+        self.assertEqual(hot.decay(now - timedelta(days=30), now), 0)
@@ -0,0 +1,112 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from core.models import Task
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from posts import images
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def image_file(name, size=(50, 50), mode='RGB', fmt='PNG', **params):
+    buffer = BytesIO()
+    Image.new(mode, size, 'red').save(buffer, fmt, **params)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageUploadTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(ImageUploadTest.user)
+
+    def create(self, image):
+        return self.client.post(reverse('posts:post_create'),
+                                {'text': 'Пост', 'image': image})
+
+    def test_upload_queues_processing(self):
+        '''Картинка сохраняется, перекодирование ставится в очередь'''
+        response = self.create(image_file('photo.png'))
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Post.objects.get().image)
+        self.assertTrue(Task.objects.filter(
+            name='posts.images.process').exists())
+
+    @override_settings(UPLOAD_MAX_BYTES=1024)
+    def test_byte_limit(self):
+        '''Файл больше UPLOAD_MAX_BYTES отклоняется формой'''
+        response = self.create(image_file('big.png', size=(300, 300),
+                                          mode='RGBA', fmt='BMP'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('image', response.context['form'].errors)
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(IMAGE_MAX_SIDE=40)
+    def test_dimension_limit(self):
+        '''Слишком большая по размерам картинка отклоняется'''
+        response = self.create(image_file('wide.png'))
+        self.assertIn('image', response.context['form'].errors)
+        self.assertFalse(Post.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_STORED_SIDE=20)
+class ImageProcessTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def post_with(self, upload):
+        return Post.objects.create(
+            author=ImageProcessTest.user, text='Пост', image=upload)
+
+    def test_reencode_to_progressive_jpeg(self):
+        '''Непрозрачная картинка уменьшается и сохраняется в JPEG'''
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        post = self.post_with(image_file(
+            'photo.jpg', size=(60, 30), fmt='JPEG', exif=exif.tobytes()))
+        original = post.image.name
+        images.process(post.pk, original)
+        post.refresh_from_db()
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        self.assertNotEqual(post.image.name, original)
+        self.assertFalse(default_storage.exists(original))
+        with default_storage.open(post.image.name) as stored:
+            image = Image.open(stored)
+            self.assertEqual(image.size, (20, 10))
+            self.assertTrue(image.info.get('progressive'))
+            self.assertNotIn('exif', image.info)
+
+    def test_alpha_kept_as_png(self):
+        '''Картинка с прозрачностью остается PNG'''
+        post = self.post_with(image_file('logo.png', mode='RGBA'))
+        images.process(post.pk, post.image.name)
+        post.refresh_from_db()
+        self.assertTrue(post.image.name.endswith('.png'))
+
+    def test_gif_untouched(self):
+        '''GIF не перекодируется'''
+        post = self.post_with(image_file('anim.gif', fmt='GIF'))
+        name = post.image.name
+        images.process(post.pk, name)
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, name)
+        self.assertTrue(Task.objects.filter(
+            name='posts.thumbnails.generate').exists())
@@ -1,6 +1,9 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import Group, Post, User
+from ..models import Comment, Follow, Group, Post, User, UserStats
 
 
 class PostModelTest(TestCase):
@@ -58,3 +61,72 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 field_name = post._meta.get_field(field).help_text
                 self.assertEqual(field_name, help_text)
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def test_posts_count(self):
+        '''Счетчик постов автора меняется при создании и удалении'''
+        post = Post.objects.create(author=CountersTest.author, text='Еще')
+        self.assertEqual(
+            UserStats.objects.get(user=CountersTest.author).posts_count, 2)
+        post.delete()
+        self.assertEqual(
+            UserStats.objects.get(user=CountersTest.author).posts_count, 1)
+
+    def test_comments_count(self):
+        '''Счетчик комментариев поста'''
+        comment = Comment.objects.create(
+            author=CountersTest.user, post=CountersTest.post, text='Текст')
+        CountersTest.post.refresh_from_db()
+        self.assertEqual(CountersTest.post.comments_count, 1)
+        comment.delete()
+        CountersTest.post.refresh_from_db()
+        self.assertEqual(CountersTest.post.comments_count, 0)
+
+    def test_follow_counts(self):
+        '''Счетчики подписчиков и подписок'''
+        follow = Follow.objects.create(
+            user=CountersTest.user, author=CountersTest.author)
+        self.assertEqual(UserStats.objects.get(
+            user=CountersTest.author).followers_count, 1)
+        self.assertEqual(UserStats.objects.get(
+            user=CountersTest.user).following_count, 1)
+        follow.delete()
+        self.assertEqual(UserStats.objects.get(
+            user=CountersTest.author).followers_count, 0)
+
+    def test_delete_user(self):
+        '''Пользователя с постами и подписками можно удалить'''
+        user = User.objects.create_user(username='leaving')
+        post = Post.objects.create(author=user, text='Пост')
+        Comment.objects.create(author=CountersTest.user, post=post,
+                               text='Комментарий')
+        Follow.objects.create(user=user, author=CountersTest.author)
+        Follow.objects.create(user=CountersTest.user, author=user)
+        user_id = user.pk
+        user.delete()
+        self.assertFalse(User.objects.filter(pk=user_id).exists())
+        self.assertFalse(UserStats.objects.filter(user_id=user_id).exists())
+        self.assertEqual(UserStats.objects.get(
+            user=CountersTest.author).followers_count, 0)
+        self.assertEqual(UserStats.objects.get(
+            user=CountersTest.user).following_count, 0)
+
+    def test_reconcile(self):
+        '''Команда reconcile_counters пересчитывает счетчики'''
+        UserStats.objects.all().delete()
+        Post.objects.update(comments_count=7)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(
+            UserStats.objects.get(user=CountersTest.author).posts_count, 1)
+        self.assertEqual(
+            UserStats.objects.get(user=CountersTest.user).posts_count, 0)
+        CountersTest.post.refresh_from_db()
+        self.assertEqual(CountersTest.post.comments_count, 0)
@@ -0,0 +1,70 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Comment, Post, User
+from posts.stemmer import stem
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(
+            author=cls.user, text='Рыжие кошки гуляют по крыше')
+        cls.other = Post.objects.create(
+            author=cls.user, text='Собака спит во дворе')
+        cls.comment = Comment.objects.create(
+            author=cls.user, post=cls.other, text='Кошка смотрит на собаку')
+
+    def setUp(self):
+        self.client = Client()
+
+    def search(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params})
+        return response.context['results'], response.context['next_cursor']
+
+    def test_stemmer(self):
+        '''Разные формы слова имеют одну основу'''
+        self.assertEqual(stem('кошки'), stem('кошкой'))
+        self.assertEqual(stem('Ёлка'), stem('елки'))
+
+    def test_word_forms_found(self):
+        '''Поиск находит пост и комментарий по другой форме слова'''
+        results, _ = self.search('кошкам')
+        found = {(result.post.id, result.comment) for result in results}
+        self.assertEqual(found, {
+            (SearchTest.post.id, None),
+            (SearchTest.other.id, SearchTest.comment)})
+
+    def test_index_follows_changes(self):
+        '''Индекс обновляется при изменении и удалении'''
+        post = Post.objects.get(pk=SearchTest.post.pk)
+        post.text = 'Теперь здесь про попугаев'
+        post.save()
+        self.assertEqual(len(self.search('кошка')[0]), 1)
+        self.assertEqual(self.search('попугай')[0][0].post, post)
+        Comment.objects.get(pk=SearchTest.comment.pk).delete()
+        self.assertEqual(self.search('кошка')[0], [])
+
+    def test_pagination(self):
+        '''Результаты листаются по курсору'''
+        for number in range(12):
+            Post.objects.create(
+                author=SearchTest.user, text=f'Кошачий пост {number}')
+        first, cursor = self.search('кошачьи')
+        self.assertEqual(len(first), 10)
+        second, last_cursor = self.search('кошачьи', cursor=cursor)
+        self.assertEqual(len(second), 2)
+        self.assertIsNone(last_cursor)
+        self.assertFalse({r.post for r in first} & {r.post for r in second})
+
+    def test_rebuild_command(self):
+        '''Команда rebuild_search_index восстанавливает индекс'''
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('3', out.getvalue())
+        self.assertEqual(len(self.search('собака')[0]), 2)
@@ -0,0 +1,145 @@
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from core.models import Task
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts import thumbnails
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=ThumbnailTest.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                'small.gif', SMALL_GIF, content_type='image/gif'))
+
+    def test_placeholder_until_ready(self):
+        '''Пока миниатюры нет, в ленте заглушка, затем картинка'''
+        response = Client().get(reverse('posts:index'))
+        self.assertNotContains(response, '<img class="card-img')
+        self.assertContains(response, 'bg-light')
+        thumbnails.generate(self.post.pk, self.post.image.name)
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, '<img class="card-img')
+
+    def test_generate_all_sizes(self):
+        '''generate кладет в кэш srcset всех размеров'''
+        for size in thumbnails.SIZES:
+            self.assertIsNone(cache.get(
+                thumbnails.srcset_key(self.post.image.name, size)))
+        thumbnails.generate(self.post.pk, self.post.image.name)
+        for size in thumbnails.SIZES:
+            self.assertIsNotNone(thumbnails.ready(self.post.image, size))
+
+    def test_widths_limited_by_source(self):
+        '''В srcset нет ширин больше исходной картинки'''
+        self.assertEqual(thumbnails.widths('card', 2), [320])
+        self.assertEqual(thumbnails.widths('card', 700), [320, 480, 640])
+        attrs = thumbnails.srcset(self.post.image.name, 'card', 700)
+        self.assertEqual(len(attrs['srcset'].split(', ')), 3)
+        self.assertIn('640w', attrs['srcset'])
+        self.assertIn(attrs['src'], attrs['srcset'])
+
+    def test_render_without_storage(self):
+        '''Готовая картинка выводится из кэша, без обращения к файлам'''
+        thumbnails.generate(self.post.pk, self.post.image.name)
+        with mock.patch.object(default_storage, 'open') as storage_open, \
+                mock.patch.object(default_storage, 'exists') as exists:
+            response = Client().get(
+                reverse('posts:post_detail', args=[self.post.pk]))
+        storage_open.assert_not_called()
+        exists.assert_not_called()
+        self.assertContains(response, 'srcset=')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(
+            response, thumbnails.SIZES['detail']['sizes'])
+
+    def test_scheduled_once(self):
+        '''Повторные промахи не ставят задачу второй раз и не запускают
+        потоков в веб-процессе'''
+        threads = threading.active_count()
+        Client().get(reverse('posts:index'))
+        Client().get(reverse('posts:index'))
+        self.assertEqual(threading.active_count(), threads)
+        self.assertEqual(Task.objects.filter(
+            name='posts.thumbnails.generate').count(), 1)
+
+    def test_preload_rebuilds_from_kvstore(self):
+        '''Без кэша srcset страница собирается одним запросом к базе'''
+        posts = [self.post]
+        for number in range(2):
+            posts.append(Post.objects.create(
+                author=ThumbnailTest.user, text='Еще пост',
+                image=SimpleUploadedFile(f'small{number}.gif', SMALL_GIF,
+                                         content_type='image/gif')))
+        for post in posts:
+            thumbnails.generate(post.pk, post.image.name)
+        expected = cache.get(
+            thumbnails.srcset_key(self.post.image.name, 'card'))
+        cache.clear()
+        with mock.patch.object(default_storage, 'open') as storage_open, \
+                self.assertNumQueries(1):
+            thumbnails.preload(posts, 'card')
+        storage_open.assert_not_called()
+        self.assertEqual(posts[0].srcsets['card'], expected)
+        for post in posts:
+            self.assertIsNotNone(post.srcsets['card'])
+        self.assertEqual(cache.get(
+            thumbnails.srcset_key(self.post.image.name, 'card')), expected)
+
+    def test_kvstore_get_many(self):
+        '''get_many кэширует и найденные записи, и промахи'''
+        thumbnails.generate(self.post.pk, self.post.image.name)
+        cache.clear()
+        source = ImageFile(self.post.image.name, default.storage)
+        absent = ImageFile('missing.gif', default.storage)
+        with self.assertNumQueries(1):
+            found = default.kvstore.get_many([source, absent])
+        self.assertEqual(list(found), [source.key])
+        self.assertEqual(found[source.key].width, 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                list(default.kvstore.get_many([source, absent])),
+                [source.key])
+
+    def test_feed_preload_without_kvstore(self):
+        '''Готовые srcset лента берет из кэша без запросов к sorl'''
+        thumbnails.generate(self.post.pk, self.post.image.name)
+        with mock.patch.object(default.kvstore, 'get_many') as get_many:
+            response = Client().get(reverse('posts:index'))
+        get_many.assert_not_called()
+        self.assertContains(response, 'srcset=')
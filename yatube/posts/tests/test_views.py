@@ -272,6 +272,39 @@ class PaginatorViewTest(TestCase):
             resp = self.client.get(view + '?page=2')
             self.assertEqual(len(resp.context['page_obj']), 2)
 
+    def test_cursor_pages(self):
+        '''Проверка листания страниц по курсору'''
+        views = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={
+                'slug': PaginatorViewTest.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'noname'}),
+        ]
+        for view in views:
+            with self.subTest(view=view):
+                first = self.client.get(view).context['page_obj']
+                self.assertFalse(first.has_previous())
+                self.assertTrue(first.has_next())
+                second = self.client.get(
+                    view, {'cursor': first.paginator.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(
+                    [post.id for post in second], [601, 600])
+                self.assertFalse(second.has_next())
+                previous = self.client.get(
+                    view, {'cursor': second.paginator.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(
+                    [post.id for post in previous],
+                    [post.id for post in first])
+
+    def test_invalid_cursor(self):
+        '''Некорректный курсор отдает первую страницу'''
+        resp = self.client.get(
+            reverse('posts:index'), {'cursor': 'broken'})
+        self.assertEqual(len(resp.context['page_obj']), 10)
+        self.assertEqual(resp.context['page_obj'][0].id, 611)
+
 
 class CacheTest(TestCase):
     @classmethod
@@ -296,12 +329,315 @@ class CacheTest(TestCase):
         self.authorized_client.force_login(self.user)
 
     def test_content_cache(self):
-        '''Проверка кэша на главной странице'''
+        '''Проверка кэша карточек на главной странице'''
         response = self.authorized_client.get(reverse('posts:index'))
-        self.post.delete()
+        Post.objects.filter(pk=self.post.pk).update(text='Новый текст')
         new_response = self.authorized_client.get(reverse('posts:index'))
         self.assertEqual(response.content, new_response.content)
-        cache.clear()
 
+        Post.objects.get(pk=self.post.pk).save()
         last_response = self.authorized_client.get(reverse('posts:index'))
-        self.assertNotIn(self.post, last_response.context.get('page_obj'))
+        self.assertContains(last_response, 'Новый текст')
+
+    def test_card_shared_between_feeds(self):
+        '''Карточка из кэша используется во всех лентах'''
+        self.authorized_client.get(reverse('posts:index'))
+        Post.objects.filter(pk=self.post.pk).update(text='Новый текст')
+        response = self.authorized_client.get(reverse(
+            'posts:group_list', kwargs={'slug': 'testscache'}))
+        self.assertNotContains(response, 'Новый текст')
+
+    def test_author_change_resets_card(self):
+        '''Изменение автора сбрасывает карточки его постов'''
+        self.authorized_client.get(reverse('posts:index'))
+        self.user.first_name = 'Имя'
+        self.user.save()
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Имя')
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryBudgetTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        cls.media = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media.enable()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='budget',
+            description='Тестовое описание')
+        cls.group2 = Group.objects.create(
+            title='Другая группа',
+            slug='budget2',
+            description='Тестовое описание')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(12):
+            cls.post = Post.objects.create(
+                author=cls.author if i % 2 else cls.user,
+                text='Тестовый пост',
+                group=cls.group)
+        for i in range(5):
+            Comment.objects.create(
+                author=cls.user if i % 2 else cls.author,
+                post=cls.post,
+                text='Комментарий')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(QueryBudgetTest.user)
+        cache.clear()
+
+    def test_feeds_within_budget(self):
+        '''Ленты и страница поста укладываются в бюджет запросов'''
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'budget'}),
+            reverse('posts:profile', kwargs={'username': 'writer'}),
+            reverse('posts:post_detail', kwargs={
+                'post_id': QueryBudgetTest.post.id}),
+            reverse('posts:follow_index'),
+            reverse('posts:hot'),
+            reverse('posts:group_index'),
+        ]
+        for url in urls:
+            for client in (self.client, self.authorized_client):
+                with self.subTest(url=url):
+                    response = client.get(url, follow=True)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertIn('queries', response['Server-Timing'])
+
+    def test_writes_within_budget(self):
+        '''Запись укладывается в бюджет запросов'''
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={
+                'post_id': QueryBudgetTest.post.id}),
+            {'text': 'Новый комментарий'})
+        self.authorized_client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'})
+        self.authorized_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': 'writer'}))
+        self.authorized_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': 'writer'}))
+
+    def test_edits_within_budget(self):
+        '''Пост с картинкой и его перенос в другую группу укладываются
+        в бюджет запросов'''
+        image = SimpleUploadedFile(
+            'small.gif',
+            b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff'
+            b'!\xf9\x04\x00\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00'
+            b'\x01\x00\x00\x02\x02D\x01\x00;',
+            content_type='image/gif')
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Пост с картинкой', 'group': QueryBudgetTest.group.id,
+             'image': image})
+        self.assertEqual(response.status_code, 302)
+        post = Post.objects.latest('id')
+        response = self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.id}),
+            {'text': 'Новый текст', 'group': QueryBudgetTest.group2.id})
+        self.assertEqual(response.status_code, 302)
+
+
+class PostDetailTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='detail')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse(
+            'posts:post_detail', kwargs={'post_id': PostDetailTest.post.id})
+
+    def test_get_does_not_comment(self):
+        '''POST на страницу поста не создает комментарий'''
+        client = Client()
+        client.force_login(PostDetailTest.user)
+        response = client.post(self.url, {'text': 'Комментарий'})
+        self.assertEqual(response.status_code, 405)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_conditional_get(self):
+        '''Повторный запрос с ETag получает 304'''
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_anonymous_page_cached(self):
+        '''Анонимным страница отдается из кэша до нового комментария'''
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Тестовый пост')
+        Comment.objects.create(
+            post=PostDetailTest.post, author=PostDetailTest.user,
+            text='Новый комментарий')
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Новый комментарий')
+
+    def test_comment_pages(self):
+        '''Комментарии выводятся страницами, остальные подгружаются'''
+        Comment.objects.bulk_create([
+            Comment(post=PostDetailTest.post, author=PostDetailTest.user,
+                    text=f'Комментарий {number}') for number in range(25)])
+        client = Client()
+        client.force_login(PostDetailTest.user)
+        response = client.get(self.url)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), 20)
+        self.assertEqual(comments[0].text, 'Комментарий 24')
+        response = client.get(
+            reverse('posts:comments', kwargs={
+                'post_id': PostDetailTest.post.id}),
+            {'cursor': comments.paginator.next_cursor})
+        self.assertEqual(len(response.context['comments']), 5)
+        self.assertEqual(
+            response.context['comments'][4].text, 'Комментарий 0')
+        self.assertNotContains(response, 'comments-more')
+
+
+class ConditionalFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='feeds')
+        cls.group = Group.objects.create(
+            title='Группа', slug='conditional', description='Описание')
+        cls.other_group = Group.objects.create(
+            title='Другая группа', slug='other', description='Описание')
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=ConditionalFeedTest.user, text='Тестовый пост',
+            group=ConditionalFeedTest.group)
+
+    def revalidate(self, url, client=None):
+        client = client or self.client
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_anonymous_headers(self):
+        '''Анонимным ленты отдаются с ETag и публичным кэшированием'''
+        response = self.client.get(reverse('posts:index'))
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=60', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+        self.assertEqual(
+            self.revalidate(reverse('posts:index')).status_code, 304)
+
+    def test_authorized_headers(self):
+        '''Вошедшим ленты отдаются только с перепроверкой'''
+        client = Client()
+        client.force_login(ConditionalFeedTest.user)
+        url = reverse('posts:profile', kwargs={'username': 'feeds'})
+        response = client.get(url)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertNotEqual(response['ETag'], self.client.get(url)['ETag'])
+        self.assertEqual(self.revalidate(url, client).status_code, 304)
+
+    def test_changes_reset_etag(self):
+        '''Новый пост и перенос в другую группу меняют ETag лент'''
+        urls = [reverse('posts:index'),
+                reverse('posts:group_list', kwargs={'slug': 'conditional'}),
+                reverse('posts:profile', kwargs={'username': 'feeds'})]
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        Post.objects.create(author=ConditionalFeedTest.user, text='Новый',
+                            group=ConditionalFeedTest.group)
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+        url = urls[1]
+        etag = self.client.get(url)['ETag']
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = ConditionalFeedTest.other_group
+        post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_user_changes(self):
+        '''Регистрация и вход не сбрасывают ETag лент, смена имени
+        сбрасывает'''
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        user = User.objects.create_user(username='newcomer', password='pw')
+        Client().login(username='newcomer', password='pw')
+        user.set_password('other')
+        user.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        author = User.objects.get(pk=ConditionalFeedTest.user.pk)
+        author.first_name = 'Имя'
+        author.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Имя')
+        profile = reverse('posts:profile', kwargs={'username': 'feeds'})
+        self.client.get(profile)
+        author.username = 'renamed'
+        author.save()
+        self.assertEqual(self.client.get(profile).status_code, 404)
+
+    def test_missing_group(self):
+        '''Несуществующая группа отдает 404 без ETag'''
+        response = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': 'missing'}))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class FollowApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('posts:api_follow', kwargs={'username': 'writer'})
+        self.client.force_login(FollowApiTest.user)
+
+    def test_follow_and_unfollow(self):
+        '''POST подписывает, DELETE отписывает, повтор ничего не меняет'''
+        for method, following, changed in (('post', True, True),
+                                           ('post', True, False),
+                                           ('delete', False, True),
+                                           ('delete', False, False)):
+            with self.subTest(method=method, changed=changed):
+                data = getattr(self.client, method)(self.url).json()
+                self.assertEqual(data['following'], following)
+                self.assertEqual(data['changed'], changed)
+                self.assertEqual(data['followers'], int(following))
+                self.assertEqual(Follow.objects.count(), int(following))
+
+    def test_guest(self):
+        '''Неавторизованный пользователь получает 401'''
+        response = Client().post(self.url)
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_missing_author(self):
+        '''Несуществующий автор отдает 404'''
+        response = self.client.post(
+            reverse('posts:api_follow', kwargs={'username': 'missing'}))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,193 @@
+'''Адаптивные миниатюры Post.image.
+
+Каждый размер из SIZES объявляет ширины для srcset, пропорции кадра
+и атрибут sizes. Фоновая задача generate создает миниатюры всех
+ширин и кладет в кэш готовые src и srcset, поэтому шаблон читает
+только кэш и не обращается к хранилищу. Ленты заранее загружают
+srcset всех постов страницы функцией preload.
+'''
+import hashlib
+
+from core.tasks import task
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from PIL import Image
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import cards
+from .models import Post
+
+# Все размеры, в которых шаблоны показывают Post.image.
+SIZES = {
+    'card': {
+        'widths': (320, 480, 640, 960, 1280),
+        'ratio': (960, 339),
+        'sizes': '(min-width: 1400px) 1296px, (min-width: 1200px) 1116px,'
+                 ' 100vw',
+    },
+    'detail': {
+        'widths': (320, 480, 640, 960, 1280),
+        'ratio': (960, 339),
+        'sizes': '(min-width: 768px) 75vw, 100vw',
+    },
+}
+OPTIONS = {'crop': 'center', 'upscale': True}
+PENDING_KEY = 'thumbnail_pending:{}'
+SRCSET_KEY = 'thumbnail_srcset:{}:{}'
+
+
+class Backend(ThumbnailBackend):
+    def thumbnail_file(self, source, geometry_string, **options):
+        '''Файл миниатюры, которую вернул бы get_thumbnail.
+
+        Повторяет вычисление имени из get_thumbnail, но ничего
+        не генерирует и не читает.
+        '''
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+
+backend = Backend()
+
+
+def digest(name):
+    return hashlib.md5(name.encode()).hexdigest()
+
+
+def pending_key(name):
+    return PENDING_KEY.format(digest(name))
+
+
+def srcset_key(name, size):
+    return SRCSET_KEY.format(size, digest(name))
+
+
+def source_width(name):
+    '''Ширина исходной картинки; читается только заголовок.'''
+    with default_storage.open(name) as file:
+        return Image.open(file).width
+
+
+def widths(size, source):
+    '''Ширины size не больше исходной, но хотя бы одна.'''
+    declared = SIZES[size]['widths']
+    return [width for width in declared if width <= source] or [declared[0]]
+
+
+def geometry(size, width):
+    ratio_width, ratio_height = SIZES[size]['ratio']
+    return f'{width}x{round(width * ratio_height / ratio_width)}'
+
+
+def attributes(urls):
+    return {
+        'src': urls[-1][0],
+        'srcset': ', '.join(f'{url} {width}w' for url, width in urls),
+    }
+
+
+def srcset(name, size, source):
+    '''Создает миниатюры size и возвращает атрибуты src и srcset.'''
+    return attributes([
+        (backend.get_thumbnail(name, geometry(size, width), **OPTIONS).url,
+         width)
+        for width in widths(size, source)])
+
+
+def rebuild(names, size):
+    '''srcset картинок names по записям key-value store sorl.
+
+    Все записи читаются одним пакетом, хранилище не трогается.
+    Картинки, у которых созданы не все миниатюры, пропускаются.
+    '''
+    sources = {name: ImageFile(name, default.storage) for name in names}
+    files = {(name, width): backend.thumbnail_file(
+        source, geometry(size, width), **OPTIONS)
+        for name, source in sources.items()
+        for width in SIZES[size]['widths']}
+    stored = default.kvstore.get_many(
+        list(sources.values()) + list(files.values()))
+    result = {}
+    for name, source in sources.items():
+        if source.key not in stored:
+            continue
+        needed = widths(size, stored[source.key].width)
+        urls = [(stored[files[name, width].key].url, width)
+                for width in needed if files[name, width].key in stored]
+        if len(urls) == len(needed):
+            result[name] = attributes(urls)
+    return result
+
+
+def preload(posts, size):
+    '''Загружает srcset размера size для всех постов страницы.
+
+    Кэш читается одним get_many, промахи собираются из key-value
+    store sorl. Результат сохраняется в post.srcsets, откуда его
+    берет шаблонный тег.
+    '''
+    keys = {srcset_key(post.image.name, size): post
+            for post in posts if post.image}
+    found = cache.get_many(list(keys))
+    missing = {key: post.image.name for key, post in keys.items()
+               if key not in found}
+    if missing:
+        rebuilt = rebuild(set(missing.values()), size)
+        fresh = {key: rebuilt[name] for key, name in missing.items()
+                 if name in rebuilt}
+        if fresh:
+            cache.set_many(fresh, settings.THUMBNAIL_SRCSET_TIMEOUT)
+            found.update(fresh)
+    for key, post in keys.items():
+        post.__dict__.setdefault('srcsets', {})[size] = found.get(key)
+
+
+def ready(image, size):
+    '''Атрибуты миниатюр размера size, если они уже созданы.'''
+    if not image:
+        return None
+    post = image.instance
+    if size not in getattr(post, 'srcsets', {}):
+        preload([post], size)
+    attrs = post.srcsets[size]
+    if attrs is None:
+        schedule(post.pk, image.name)
+    return attrs
+
+
+@task(max_attempts=3, retry_delay=30)
+def generate(post_id, name):
+    '''Создает миниатюры всех размеров и обновляет карточку поста.'''
+    source = source_width(name)
+    cache.set_many(
+        {srcset_key(name, size): srcset(name, size, source)
+         for size in SIZES},
+        settings.THUMBNAIL_SRCSET_TIMEOUT)
+    cards.bump('post', post_id)
+    post = Post.objects.only('author', 'group').filter(pk=post_id).first()
+    if post is not None:
+        cards.bump_feeds(*cards.feed_scopes(post))
+    cache.delete(pending_key(name))
+
+
+def schedule(post_id, name):
+    '''Ставит генерацию миниатюр в очередь задач.
+
+    Пока задача не выполнена, повторные вызовы для того же файла
+    ничего не делают: шаблоны вызывают schedule при каждом промахе.
+    '''
+    if cache.add(pending_key(name), True, settings.THUMBNAIL_PENDING_TIMEOUT):
+        generate.delay(post_id, name)
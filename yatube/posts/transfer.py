@@ -0,0 +1,157 @@
+'''Потоковый импорт и экспорт групп, постов, комментариев и подписок.
+
+Чтение идет через iterator() по возрастанию id, запись — пачками
+bulk_create в отдельных транзакциях, поэтому память не зависит
+от объема данных. Повторная загрузка тех же строк безопасна:
+конфликты по первичному ключу пропускаются.
+'''
+import csv
+import json
+from contextlib import contextmanager
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from . import cards, counters, feed, hot, search
+from .models import Comment, Follow, Group, Post
+
+FORMATS = ('jsonl', 'csv')
+MODELS = {
+    'group': (Group, ('id', 'title', 'slug', 'description')),
+    'post': (Post, ('id', 'text', 'pub_date', 'author_id', 'group_id',
+                    'image')),
+    'comment': (Comment, ('id', 'post_id', 'author_id', 'text',
+                          'pub_date')),
+    'follow': (Follow, ('id', 'user_id', 'author_id')),
+}
+
+
+def export_rows(name, after=0, chunk_size=2000):
+    '''Строки модели name словарями, начиная с id больше after.'''
+    model, fields = MODELS[name]
+    rows = model.objects.filter(pk__gt=after).order_by('pk').values_list(
+        *fields)
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield {field: value.isoformat() if hasattr(value, 'isoformat')
+               else value for field, value in zip(fields, row)}
+
+
+def write(rows, output, fmt, fields, header=True):
+    '''Пишет строки в файл, возвращает id последней записанной.'''
+    last = None
+    if fmt == 'csv':
+        writer = csv.DictWriter(output, fieldnames=fields)
+        if header:
+            writer.writeheader()
+    for row in rows:
+        if fmt == 'csv':
+            writer.writerow(row)
+        else:
+            output.write(json.dumps(row, ensure_ascii=False) + '\n')
+        last = row['id']
+    return last
+
+
+def read(source, fmt):
+    if fmt == 'csv':
+        yield from csv.DictReader(source)
+        return
+    for line in source:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_checkpoint(path):
+    '''Точка продолжения из файла .checkpoint или 0.'''
+    try:
+        with open(path) as marker:
+            return int(marker.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def write_checkpoint(path, value):
+    with open(path, 'w') as marker:
+        marker.write(str(value))
+
+
+@contextmanager
+def keep_dates(model):
+    '''bulk_create сохраняет pub_date из файла, а не текущее время.'''
+    fields = [field for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now_add', False)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _converters(model, fields):
+    by_attname = {field.attname: field
+                  for field in model._meta.concrete_fields}
+    converters = {}
+    for name in fields:
+        field = by_attname[name]
+        target = field.target_field if field.is_relation else field
+
+        def convert(value, field=field, target=target):
+            if value in (None, '') and field.null:
+                return None
+            return target.to_python(value)
+        converters[name] = convert
+    return converters
+
+
+def import_rows(name, rows, batch_size=2000, skip=0, on_batch=None):
+    '''Загружает строки пачками, пропустив первые skip.
+
+    После каждой пачки вызывается on_batch(число обработанных строк),
+    это число и есть точка продолжения для skip.
+    '''
+    model, fields = MODELS[name]
+    converters = _converters(model, fields)
+    done = skip
+    batch = []
+
+    def flush():
+        nonlocal done
+        with transaction.atomic():
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+        done += len(batch)
+        batch.clear()
+        if on_batch is not None:
+            on_batch(done)
+
+    with keep_dates(model):
+        for number, row in enumerate(rows):
+            if number < skip:
+                continue
+            batch.append(model(**{
+                field: converters[field](row.get(field))
+                for field in fields}))
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    reset_sequences(model)
+    return done
+
+
+def reset_sequences(model):
+    '''После вставки с явными id счетчик PostgreSQL отстает.'''
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def rebuild_derived():
+    '''Счетчики, ленты, рейтинг и поиск после загрузки в обход сигналов.'''
+    counters.reconcile()
+    feed.rebuild()
+    hot.recompute()
+    search.rebuild()
+    cards.bump_feeds('all')
@@ -1,80 +1,198 @@
+from calendar import timegm
+
+from core import uploads
+from core.cache import remember, store
+from core.decorators import conditional_page, query_budget, use_replica
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+from . import cards, feed, follows, groups, images, search, thumbnails
 from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post, User
+from .models import Group, Post, User
+from .paginators import CursorPaginator
+from .queries import (COMMENT_ORDERING, FEED_ORDERING, HOT_ORDERING,
+                      POST_ORDERING, author_feed, follow_feed, group_feed,
+                      hot_feed, index_feed, post_comments)
 
 LIMIT = 10
+COMMENTS_LIMIT = 20
+GROUPS_LIMIT = 20
+DETAIL_KEY = 'post_detail:{}:{}'
+
+
+def paginator(request, post_list, ordering=POST_ORDERING):
+    '''По умолчанию страницы листаются по ?cursor=,
+    нумерованные страницы отдаются только по явному ?page=.
+    '''
+    if 'page' in request.GET:
+        paginator = Paginator(post_list.order_by(*ordering), LIMIT)
+        return paginator.get_page(request.GET.get('page'))
+    paginator = CursorPaginator(post_list, LIMIT, ordering)
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+def index_etag(request):
+    return cards.feed_etag('index')
+
 
+def group_etag(request, slug):
+    group_id = cards.cached_id(Group, 'slug', slug)
+    return group_id and cards.feed_etag(f'group:{group_id}')
 
-def paginator(request, post_list):
-    paginator = Paginator(post_list, LIMIT)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
 
+def profile_etag(request, username):
+    author_id = cards.cached_id(User, 'username', username)
+    return author_id and cards.feed_etag(f'user:{author_id}')
 
+
+@query_budget(5)
+@use_replica
+@conditional_page(index_etag)
 def index(request):
-    post_list = Post.objects.all().select_related('group', 'author')
+    post_list = index_feed()
     page_obj = paginator(request, post_list)
+    thumbnails.preload(page_obj, 'card')
     context = {'page_obj': page_obj}
     return render(request, 'posts/index.html', context)
 
 
+@query_budget(5)
+@use_replica
+def hot_posts(request):
+    '''Посты по убыванию рейтинга из hot.py.'''
+    page_obj = paginator(request, hot_feed(), HOT_ORDERING)
+    thumbnails.preload(page_obj, 'card')
+    context = {'page_obj': page_obj,
+               'hot': True}
+    return render(request, 'posts/hot.html', context)
+
+
+@query_budget(3)
+@use_replica
+def group_index(request):
+    '''Каталог групп из кэша groups.directory().'''
+    page_obj = Paginator(groups.directory(), GROUPS_LIMIT).get_page(
+        request.GET.get('page'))
+    context = {'page_obj': page_obj}
+    return render(request, 'posts/group_index.html', context)
+
+
+@query_budget(6)
+@use_replica
+@conditional_page(group_etag)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    post_list = Post.objects.select_related('group').filter(group=group)
+    group = get_object_or_404(
+        Group.objects.select_related('stats'), slug=slug)
+    post_list = group_feed(group.id)
     page_obj = paginator(request, post_list)
+    thumbnails.preload(page_obj, 'card')
     context = {'group': group,
                'page_obj': page_obj}
     return render(request, 'posts/group_list.html', context)
 
 
+@query_budget(8)
+@use_replica
+@conditional_page(profile_etag)
 def profile(request, username):
     user = request.user.id
-    author = get_object_or_404(User, username=username)
-    post_list = (Post.objects.select_related('author')
-                 .filter(author_id=author.id))
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    post_list = author_feed(author.id)
     page_obj = paginator(request, post_list)
-    following = False
-    if Follow.objects.filter(
-            author_id=author.id,
-            user_id=request.user.id).exists():
-        following = True
+    thumbnails.preload(page_obj, 'card')
+    following = follows.is_following(request.user.id, author.id)
     context = {'page_obj': page_obj,
                'author': author,
-               'post_list': post_list,
                'following': following,
                'user': user}
     return render(request, 'posts/profile.html', context)
 
 
+def comment_page(post_id, cursor=None):
+    paginator = CursorPaginator(
+        post_comments(post_id), COMMENTS_LIMIT, COMMENT_ORDERING)
+    return paginator.get_page(cursor)
+
+
+@query_budget(6)
+@use_replica
+@require_safe
 def post_detail(request, post_id):
-    post_d = get_object_or_404(Post, id=post_id)
-    author = get_object_or_404(User, id=post_d.author_id)
-    posts = Post.objects.select_related('author').filter(author_id=author.id)
-    form = CommentForm()
-    if form:
-        add_comment(request, post_id)
-    comments = Comment.objects.select_related('post').filter(
-        post_id=post_d.id)
-    context = {'post_d': post_d,
-               'author': author,
-               'posts': posts,
-               'form': form,
-               'comments': comments}
-    return render(request, 'posts/post_detail.html', context)
+    '''Страница поста только читает данные.
+
+    Поддерживает условные запросы, анонимным пользователям страница
+    отдается из кэша, ключ которого меняется при правке поста,
+    новом комментарии или изменении автора и группы.
+    '''
+    post_d = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), id=post_id)
+    author = post_d.author
+    stats = getattr(author, 'stats', None)
+    version = cards.etag(post_d, stats and stats.posts_count)
+    key = DETAIL_KEY.format(post_d.pk, version)
+    comments = None
+
+    def compute():
+        nonlocal comments
+        comments = comment_page(post_d.id)
+        latest = comments[0].pub_date if comments else post_d.pub_date
+        return max(post_d.pub_date, latest), None
 
+    modified, content = remember(key, compute, settings.POST_CARD_TIMEOUT)
+    etag = quote_etag(f'{version}-{request.user.pk or 0}')
+    last_modified = timegm(modified.utctimetuple())
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is None and content and not request.user.is_authenticated:
+        response = HttpResponse(content)
+    elif response is None:
+        if comments is None:
+            comments = comment_page(post_d.id)
+        context = {'post_d': post_d,
+                   'author': author,
+                   'form': CommentForm(),
+                   'comments': comments}
+        response = render(request, 'posts/post_detail.html', context)
+        if not request.user.is_authenticated:
+            store(key, (modified, response.content),
+                  settings.POST_CARD_TIMEOUT)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ('Cookie',))
+    return response
 
+
+@query_budget(3)
+@use_replica
+@require_safe
+def comments_page(request, post_id):
+    '''Следующая страница комментариев фрагментом HTML.'''
+    context = {'comments': comment_page(post_id, request.GET.get('cursor')),
+               'post_id': post_id}
+    return render(request, 'posts/includes/comments.html', context)
+
+
+@query_budget(15)
 @login_required
+@transaction.atomic
 def post_create(request):
     if request.method == 'POST':
-        form = PostForm(request.POST, files=request.FILES or None)
+        form = PostForm(request.POST, files=request.FILES or None,
+                        oversized=uploads.oversized(request))
         if form.is_valid():
             new_post = form.save(commit=False)
             new_post.author = request.user
             new_post.save()
+            if new_post.image:
+                images.schedule(new_post.pk, new_post.image.name)
             return redirect('posts:profile', new_post.author)
-        form = PostForm()
         context = {'form': form}
         return render(request, 'posts/create_post.html', context)
     form = PostForm()
@@ -82,13 +200,15 @@ def post_create(request):
     return render(request, 'posts/create_post.html', context)
 
 
+@query_budget(14)
 @login_required
 def post_edit(request, post_id):
-    edit_post = get_object_or_404(Post, id=post_id)
-    author = get_object_or_404(User, id=edit_post.author_id)
+    edit_post = get_object_or_404(
+        Post.objects.select_related('author'), id=post_id)
+    author = edit_post.author
     context = {'edit_post': edit_post,
                'author': author}
-    if request.user.username != author.username:
+    if request.user.id != author.id:
         context['is_edit'] = False
         return redirect('posts:post_detail', post_id)
     else:
@@ -97,17 +217,23 @@ def post_edit(request, post_id):
             form = PostForm(
                 request.POST or None,
                 instance=edit_post,
-                files=request.FILES or None)
+                files=request.FILES or None,
+                oversized=uploads.oversized(request))
             if form.is_valid():
                 edit_post = form.save(commit=False)
                 edit_post.save()
+                if 'image' in form.changed_data and edit_post.image:
+                    images.schedule(edit_post.pk, edit_post.image.name)
                 return redirect('posts:post_detail', post_id)
-        form = PostForm(instance=edit_post)
+        else:
+            form = PostForm(instance=edit_post)
         context['form'] = form
         return render(request, 'posts/create_post.html', context)
 
 
+@query_budget(10)
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -119,36 +245,43 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(5)
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+    results, next_cursor = [], None
+    if query:
+        results, next_cursor = search.search(
+            query, request.GET.get('cursor'), LIMIT)
+    context = {'query': query,
+               'results': results,
+               'next_cursor': next_cursor}
+    return render(request, 'posts/search.html', context)
+
+
+@query_budget(8)
+@use_replica
 @login_required
 def follow_index(request):
-    follow = Follow.objects.filter(user_id=request.user.id)
-    post_list = Post.objects.select_related('author').filter(
-        author__in=follow.values('author'))
-    page_obj = paginator(request, post_list)
+    feed.pull(request.user.id)
+    entries = follow_feed(request.user.id)
+    page_obj = paginator(request, entries, FEED_ORDERING)
+    page_obj.object_list = [entry.post for entry in page_obj]
+    thumbnails.preload(page_obj, 'card')
     context = {'page_obj': page_obj}
     return render(request, 'posts/follow.html', context)
 
 
+@query_budget(14)
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
-    if Follow.objects.filter(author_id=author.id, user_id=request.user.id
-                             ).exists():
-        return redirect('posts:profile', username=author.username)
-    if User.objects.get(username=username).id != request.user.id:
-        follow = Follow.objects.create(
-            author_id=author.id,
-            user_id=request.user.id)
-        follow.save()
-    return redirect('posts:profile', username=author.username)
+    author = get_object_or_404(User.objects.only('id'), username=username)
+    follows.follow(request.user.id, author.id)
+    return redirect('posts:profile', username=username)
 
 
+@query_budget(13)
 @login_required
 def profile_unfollow(request, username):
-    unfollow = get_object_or_404(
-        Follow,
-        author_id=User.objects.get(username=username).id,
-        user_id=request.user.id)
-    unfollow.delete()
-    return redirect('posts:profile',
-                    username=User.objects.get(username=username))
+    author = get_object_or_404(User.objects.only('id'), username=username)
+    follows.unfollow(request.user.id, author.id)
+    return redirect('posts:profile', username=username)
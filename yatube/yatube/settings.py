@@ -31,6 +31,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryBudgetMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,13 +64,55 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Соединения с БД: DB_CONN_MAX_AGE — сколько секунд держать постоянное
+# соединение (проверяется в начале каждого запроса), DB_POOL_SIZE > 0
+# включает пул процесса для многопоточных серверов: соединение
+# возвращается в пул в конце запроса.
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 0))
+
+DB_CONNECTION = {
+    'CONN_MAX_AGE': 0 if DB_POOL_SIZE else int(
+        os.getenv('DB_CONN_MAX_AGE', 60)),
+    'POOL_SIZE': DB_POOL_SIZE,
+    'POOL_CHECK_AFTER': int(os.getenv('DB_POOL_CHECK_AFTER', 30)),
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        **DB_CONNECTION,
     }
 }
 
+# Реплики только для чтения перечисляются в DATABASE_REPLICA_FILES
+# через запятую; локально это копии db.sqlite3. В тестах реплики
+# зеркалируют основную базу.
+DATABASE_REPLICAS = []
+
+for number, name in enumerate(
+        filter(None, os.getenv('DATABASE_REPLICA_FILES', '').split(','))):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, name),
+        'TEST': {'MIRROR': 'default'},
+        **DB_CONNECTION,
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Сколько секунд после записи пользователь читает из основной базы.
+REPLICA_PIN_SECONDS = 5
+
+# Служебные записи, которые делает сам сайт, а не пользователь:
+# они не закрепляют пользователя за основной базой.
+REPLICA_PIN_IGNORE = ['core.Task', 'thumbnail.KVStore']
+
+REPLICA_CHECK_INTERVAL = 5
+
+REPLICA_RETRY = 30
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -102,16 +146,119 @@ LOGIN_URL = 'users:login'
 
 LOGIN_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма уходят через очередь задач, воркер отправляет их
+# через TASKS_EMAIL_BACKEND.
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+
+TASKS_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Загрузки: файл больше UPLOAD_MAX_BYTES отбрасывается при чтении
+# запроса, картинка больше IMAGE_MAX_SIDE или IMAGE_MAX_PIXELS
+# отклоняется по заголовку. После загрузки картинка уменьшается
+# до IMAGE_STORED_SIDE и перекодируется фоновой задачей.
+FILE_UPLOAD_HANDLERS = [
+    'core.uploads.LimitedUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+UPLOAD_MAX_BYTES = 10 * 2 ** 20
+
+IMAGE_MAX_SIDE = 10000
+
+IMAGE_MAX_PIXELS = 50 * 10 ** 6
+
+IMAGE_STORED_SIDE = 2048
+
+IMAGE_JPEG_QUALITY = 85
+
 MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {'default': {
-    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
-}}
+# Общий для всех процессов кэш выбирается переменной окружения
+# CACHE_BACKEND: redis (нужен django-redis), memcached (нужен pylibmc)
+# или locmem — локальная замена сервера для разработки и тестов.
+SHARED_CACHE_BACKENDS = {
+    'redis': 'django_redis.cache.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyLibMCCache',
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+}
+
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.TwoTierCache',
+        'LOCATION': 'default',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_TIMEOUT': int(os.getenv('CACHE_LOCAL_TIMEOUT', 5)),
+            'LOCAL_MAX_ENTRIES': 1000,
+        },
+    },
+    'shared': {
+        'BACKEND': SHARED_CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.getenv('CACHE_LOCATION', 'shared'),
+        'KEY_PREFIX': 'yatube',
+    },
+}
+
+# Карточки постов сбрасываются сменой версии, а не по времени.
+POST_CARD_TIMEOUT = 60 * 60 * 24
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+# Авторы с большим числом подписчиков не раскладываются по лентам
+# при публикации, их посты подтягиваются в ленту при чтении.
+FEED_FANOUT_LIMIT = 1000
+
+FEED_BACKFILL_LIMIT = 200
+
+# Лента /hot/: посты за последние HOT_WINDOW часов, рейтинг затухает
+# как (возраст + 2) ** -HOT_GRAVITY.
+HOT_WINDOW = 72
+
+HOT_GRAVITY = 1.5
+
+# Каталог групп: активные авторы писали в группу за GROUP_ACTIVE_DAYS
+# дней, кэш каталога сбрасывается изменениями и не живет дольше
+# GROUP_DIRECTORY_TIMEOUT секунд.
+GROUP_ACTIVE_DAYS = 30
+
+GROUP_DIRECTORY_TIMEOUT = 60 * 10
+
+# Подписки в кэше сбрасываются при изменении, срок — страховка.
+FOLLOW_GRAPH_TIMEOUT = 60 * 60 * 24
+
+# Нарушение бюджета запросов view: False — запись в лог, True — исключение.
+QUERY_BUDGET_STRICT = False
+
+QUERY_BUDGET_DUPLICATES = 2
+
+# Фоновые задачи выполняет manage.py run_tasks; при TASKS_EAGER
+# они выполняются сразу в вызывающем коде.
+TASKS_EAGER = os.getenv('TASKS_EAGER', '') == '1'
+
+TASKS_WORKERS = int(os.getenv('TASKS_WORKERS', 2))
+
+# Через сколько секунд задачу упавшего воркера можно забрать снова.
+TASKS_LEASE = 60 * 5
+
+# Миниатюры Post.image создаются фоновой задачей после загрузки,
+# до готовности шаблоны показывают заглушку. Готовые src и srcset
+# хранятся в кэше THUMBNAIL_SRCSET_TIMEOUT секунд.
+THUMBNAIL_PENDING_TIMEOUT = 60 * 5
+
+THUMBNAIL_SRCSET_TIMEOUT = 60 * 60 * 24 * 7
+
+# Записи sorl-thumbnail о готовых миниатюрах лежат в общем кэше,
+# база служит запасной копией; ленты читают их пакетно.
+THUMBNAIL_KVSTORE = 'posts.kvstore.KVStore'
+
+THUMBNAIL_CACHE = 'shared'
+
+# Сколько секунд браузеры и прокси могут хранить ленты для анонимных.
+PUBLIC_CACHE_MAX_AGE = 60